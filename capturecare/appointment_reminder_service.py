@@ -6,7 +6,7 @@ Handles automated SMS reminders for appointments
 import logging
 from datetime import datetime, timedelta
 from capturecare.models import db, Appointment, Patient, NotificationTemplate
-from capturecare.notification_service import NotificationService
+from capturecare.notification_service import get_notification_service
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ class AppointmentReminderService:
     """Service for sending automated appointment reminders"""
     
     def __init__(self):
-        self.notification_service = NotificationService()
+        self.notification_service = get_notification_service()
     
     def check_and_send_reminders(self):
         """
@@ -40,16 +40,32 @@ class AppointmentReminderService:
             stats['checked'] = len(future_appointments)
             logger.info(f"Checking {stats['checked']} scheduled appointments for reminders")
             
+            # Load the contact details of every patient due a reminder in one query instead of
+            # one lookup per appointment (plain rows, so the per-reminder commits don't expire them)
+            due_patient_ids = {
+                appointment.patient_id for appointment in future_appointments
+                if self.should_send_24hr_reminder(appointment) or self.should_send_day_before_reminder(appointment)
+            }
+            patients = {}
+            if due_patient_ids:
+                patients = {
+                    patient.id: patient for patient in Patient.query.with_entities(
+                        Patient.id, Patient.first_name, Patient.last_name, Patient.mobile, Patient.phone
+                    ).filter(Patient.id.in_(due_patient_ids))
+                }
+            
             for appointment in future_appointments:
                 try:
+                    patient = patients.get(appointment.patient_id)
+                    
                     # Check and send 24hr reminder
                     if self.should_send_24hr_reminder(appointment):
-                        if self.send_24hr_reminder(appointment):
+                        if self.send_24hr_reminder(appointment, patient):
                             stats['24hr_sent'] += 1
                     
                     # Check and send day-before reminder
                     if self.should_send_day_before_reminder(appointment):
-                        if self.send_day_before_reminder(appointment):
+                        if self.send_day_before_reminder(appointment, patient):
                             stats['day_before_sent'] += 1
                             
                 except Exception as e:
@@ -113,13 +129,15 @@ class AppointmentReminderService:
         
         return True
     
-    def send_24hr_reminder(self, appointment):
+    def send_24hr_reminder(self, appointment, patient=None):
         """
         Send 24-hour reminder SMS
+        patient may be passed in when already loaded (needs id, names, mobile and phone)
         Returns True if sent successfully, False otherwise
         """
         try:
-            patient = Patient.query.get(appointment.patient_id)
+            if patient is None:
+                patient = Patient.query.get(appointment.patient_id)
             if not patient:
                 logger.warning(f"Patient not found for appointment {appointment.id}")
                 return False
@@ -187,13 +205,15 @@ class AppointmentReminderService:
             db.session.rollback()
             return False
     
-    def send_day_before_reminder(self, appointment):
+    def send_day_before_reminder(self, appointment, patient=None):
         """
         Send day-before reminder SMS (sent at 6pm the day before)
+        patient may be passed in when already loaded (needs id, names, mobile and phone)
         Returns True if sent successfully, False otherwise
         """
         try:
-            patient = Patient.query.get(appointment.patient_id)
+            if patient is None:
+                patient = Patient.query.get(appointment.patient_id)
             if not patient:
                 logger.warning(f"Patient not found for appointment {appointment.id}")
                 return False
@@ -0,0 +1,184 @@
+"""
+Background workers for CaptureCare
+Moves non-critical database writes and deferred work off the request thread
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+
+class BatchedInsertWriter:
+    """
+    Queue rows for a table and insert them in batches from a daemon thread.
+
+    A batch is written when it reaches batch_size rows or flush_interval seconds after
+    its first row, whichever comes first. The worker thread is started lazily on the
+    first put() in each process, so it survives gunicorn --preload forking, and queued
+    rows are flushed at interpreter exit so a worker shutdown doesn't drop them.
+    """
+
+    # Put on the queue at exit to make the worker write what it has and stop
+    _STOP = object()
+
+    # How long close() waits for the worker to finish its last batch
+    SHUTDOWN_TIMEOUT = 5.0
+
+    def __init__(self, table, batch_size=50, flush_interval=1.0):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._app = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def init_app(self, app):
+        self._app = app
+
+    def put(self, row):
+        """Queue a row (dict of column values) for insertion"""
+        self._ensure_worker()
+        self._queue.put(row)
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name=f'{self.table.name}-writer',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def close(self):
+        """Write any queued rows and stop the worker thread"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        thread.join(self.SHUTDOWN_TIMEOUT)
+        if thread.is_alive():
+            logger.warning(f"⚠️ {self.table.name} writer did not finish flushing before shutdown")
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is self._STOP:
+                return
+            rows = [row]
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is self._STOP:
+                    stopping = True
+                    break
+                rows.append(row)
+            self._write(rows)
+            if stopping:
+                return
+
+    def _write(self, rows):
+        # executemany needs the same keys on every row. Group rows by the columns they set
+        # rather than padding with None, so omitted columns still get their server defaults
+        groups = {}
+        for row in rows:
+            groups.setdefault(frozenset(row), []).append(row)
+
+        with self._app.app_context():
+            try:
+                for group in groups.values():
+                    db.session.execute(self.table.insert(), group)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"❌ Failed to write {len(rows)} {self.table.name} rows: {e}")
+            finally:
+                db.session.remove()
+
+
+class BackgroundTaskRunner:
+    """
+    Run functions on a daemon thread inside an app context, off the request thread.
+
+    Tasks run one at a time in the order they become due, so a delayed task doesn't hold up
+    the ones behind it. Like BatchedInsertWriter, the worker thread is started lazily on the
+    first submit() in each process. Queued tasks live in memory only, so use it for work that
+    can be lost on a restart.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._app = None
+        # (run_at, seq, func, args, kwargs) - seq keeps same-time tasks in submission order
+        self._heap = []
+        self._seq = itertools.count()
+        self._ready = threading.Condition()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) to run in the background"""
+        self.submit_later(0, func, *args, **kwargs)
+
+    def submit_later(self, delay, func, *args, **kwargs):
+        """Queue func(*args, **kwargs) to run no earlier than delay seconds from now"""
+        self._ensure_worker()
+        with self._ready:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), func, args, kwargs))
+            self._ready.notify()
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _next_task(self):
+        """Block until the earliest task is due, then pop it"""
+        with self._ready:
+            while True:
+                if not self._heap:
+                    self._ready.wait()
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait <= 0:
+                    return heapq.heappop(self._heap)
+                # Woken early if a sooner task is submitted meanwhile
+                self._ready.wait(wait)
+
+    def _run(self):
+        while True:
+            _, _, func, args, kwargs = self._next_task()
+            self._execute(func, args, kwargs)
+
+    def _execute(self, func, args, kwargs):
+        with self._app.app_context():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"❌ {func.__name__} failed: {e}", exc_info=True)
+            finally:
+                db.session.remove()
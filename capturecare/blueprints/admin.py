@@ -93,6 +93,10 @@ def cleanup_unknown_appointments():
         logger.error(f"Error cleaning up unknown appointments: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def count_appointments(*criteria):
+    """SELECT count(*) FROM appointments WHERE ... - without Query.count()'s subquery wrapper"""
+    return db.session.scalar(db.select(db.func.count()).select_from(Appointment).where(*criteria))
+
 @admin_bp.route('/stats', methods=['GET'])
 @login_required
 @admin_required
@@ -100,12 +104,12 @@ def get_admin_stats():
     """Get system statistics"""
     try:
         # Count unknown appointments
-        unknown_count = Appointment.query.filter(
+        unknown_count = count_appointments(
             or_(
                 Appointment.patient_id.is_(None),
                 Appointment.practitioner_id.is_(None)
             )
-        ).count()
+        )
         
         # Find patients with "Unknown" in name
         unknown_patients = Patient.query.filter(
@@ -118,9 +122,9 @@ def get_admin_stats():
         unknown_patient_ids = [p.id for p in unknown_patients]
         appointments_with_unknown_patients = 0
         if unknown_patient_ids:
-            appointments_with_unknown_patients = Appointment.query.filter(
+            appointments_with_unknown_patients = count_appointments(
                 Appointment.patient_id.in_(unknown_patient_ids)
-            ).count()
+            )
         
         # Find practitioners with "Unknown" in name
         unknown_practitioners = User.query.filter(
@@ -133,9 +137,9 @@ def get_admin_stats():
         unknown_practitioner_ids = [u.id for u in unknown_practitioners]
         appointments_with_unknown_practitioners = 0
         if unknown_practitioner_ids:
-            appointments_with_unknown_practitioners = Appointment.query.filter(
+            appointments_with_unknown_practitioners = count_appointments(
                 Appointment.practitioner_id.in_(unknown_practitioner_ids)
-            ).count()
+            )
         
         total_unknown = unknown_count + appointments_with_unknown_patients + appointments_with_unknown_practitioners
         
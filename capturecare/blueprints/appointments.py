@@ -12,6 +12,7 @@ from ..patient_matcher import ClinikoIntegration
 from ..ai_health_reporter import AIHealthReporter
 from ..email_sender import EmailSender
 from ..heygen_service import HeyGenService
+from ..config import get_twilio_credentials
 
 # Create blueprint
 appointments_bp = Blueprint('appointments', __name__)
@@ -29,8 +30,8 @@ def get_calendar_sync():
 # Helper to get notification service
 def get_notification_service():
     try:
-        from ..notification_service import NotificationService
-        return NotificationService()
+        from ..notification_service import get_notification_service as get_shared_notification_service
+        return get_shared_notification_service()
     except Exception as e:
         logger.warning(f"Notification service not available: {e}")
         return None
@@ -424,8 +425,7 @@ def create_appointment():
         notification_result = {'sms': False, 'email': False}
         if patient:
             try:
-                from ..notification_service import NotificationService
-                notification_service = NotificationService()
+                notification_service = get_notification_service()
                 
                 # Prepare template variables
                 start_time_formatted = appointment.start_time.strftime('%d/%m/%Y at %I:%M %p')
@@ -584,8 +584,7 @@ def send_appointment_confirmation(appointment_id):
             return jsonify({'success': False, 'error': 'No patient associated with this appointment'}), 400
             
         # Get notification service (assumed to be in app context or created fresh)
-        from ..notification_service import NotificationService
-        notification_service = NotificationService()
+        notification_service = get_notification_service()
         
         results = {
             'sms': False,
@@ -2380,8 +2379,7 @@ def add_patient_appointment(patient_id):
         notification_result = {'sms': False, 'email': False}
         if patient:
             try:
-                from ..notification_service import NotificationService
-                notification_service = NotificationService()
+                notification_service = get_notification_service()
                 
                 # Prepare template variables
                 start_time_formatted = new_appointment.start_time.strftime('%d/%m/%Y at %I:%M %p')
@@ -2805,23 +2803,8 @@ def generate_video_report(patient_id):
 @appointments_bp.route('/video-room/<room_name>')
 def video_room_patient(room_name):
     """Public page for patients to join video consultation"""
-    # Reload .env file to get latest settings
-    from dotenv import load_dotenv
-    env_file_path = os.path.join(current_app.root_path, '..', 'capturecare.env')
-    if os.path.exists(env_file_path):
-        load_dotenv(env_file_path, override=True)
-    
-    # Get credentials from environment (most up-to-date)
-    account_sid = os.getenv('TWILIO_ACCOUNT_SID', '') or current_app.config.get('TWILIO_ACCOUNT_SID', '')
-    auth_token = os.getenv('TWILIO_AUTH_TOKEN', '') or current_app.config.get('TWILIO_AUTH_TOKEN', '')
-    api_key_sid = os.getenv('TWILIO_API_KEY_SID', '') or current_app.config.get('TWILIO_API_KEY_SID', '')
-    api_key_secret = os.getenv('TWILIO_API_KEY_SECRET', '') or current_app.config.get('TWILIO_API_KEY_SECRET', '')
-    
-    # Strip whitespace
-    account_sid = account_sid.strip() if account_sid else ''
-    auth_token = auth_token.strip() if auth_token else ''
-    api_key_sid = api_key_sid.strip() if api_key_sid else ''
-    api_key_secret = api_key_secret.strip() if api_key_secret else ''
+    # Get latest credentials (re-read only when the .env file changes)
+    account_sid, auth_token, api_key_sid, api_key_secret = get_twilio_credentials()
     
     # If credentials not configured, show waiting screen
     if not account_sid:
@@ -3101,8 +3084,7 @@ def send_withings_email(patient_id):
             body_html = f"<html><body><h1>Connect Your Withings Device</h1><p>Hello {patient.first_name},</p><p><a href='{authorize_url}' style='background-color: #00698f; color: white; padding: 16px 32px; text-decoration: none; border-radius: 6px; font-weight: bold;'>CONNECT TO YOUR WITHINGS DEVICE</a></p></body></html>"
         
         # Use NotificationService which has send_email method for HTML emails
-        from ..notification_service import NotificationService
-        notification_service = NotificationService()
+        notification_service = get_notification_service()
         
         body_text = f"Hello {patient.first_name},\n\nYour healthcare provider has requested that you connect your Withings device to your CaptureCare account.\n\nClick this link to authorize: {authorize_url}\n\nIf the link doesn't work, copy and paste it into your browser."
         
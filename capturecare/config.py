@@ -1,4 +1,8 @@
 import os
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
 from dotenv import load_dotenv
 from datetime import timezone, timedelta
 
@@ -9,23 +13,40 @@ load_dotenv(_env_path)
 print(f"🔧 Loaded .env from: {_env_path}")
 print(f"🔧 SMTP_USERNAME from .env: {os.getenv('SMTP_USERNAME')}")
 
+# Routes that want rotated secrets re-read Secret Manager at most this often
+SECRET_REFRESH_INTERVAL = 300  # seconds
+
+_secrets_loaded_at = None
+_secrets_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def secret_manager_client():
+    """Process-wide Secret Manager client; its gRPC channel and credentials are reused across reloads"""
+    from google.cloud import secretmanager
+    return secretmanager.SecretManagerServiceClient()
+
+# gRPC channels aren't fork-safe: with gunicorn --preload the first client is built in the master,
+# so each forked worker must drop the inherited one and build its own
+os.register_at_fork(after_in_child=secret_manager_client.cache_clear)
+
 class Config:
     GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID', '')
     USE_SECRET_MANAGER = os.getenv('USE_SECRET_MANAGER', 'False').lower() == 'true'
     
     def __init__(self):
+        global _secrets_loaded_at
         if self.USE_SECRET_MANAGER and self.GCP_PROJECT_ID:
             self._load_secrets_from_gcp()
             # Reload all config attributes after secrets are loaded
             self._reload_config_attributes()
+            _secrets_loaded_at = time.monotonic()
     
     def _load_secrets_from_gcp(self):
         try:
-            from google.cloud import secretmanager
             import logging
             logger = logging.getLogger(__name__)
             
-            client = secretmanager.SecretManagerServiceClient()
+            client = secret_manager_client()
             
             secrets = {
                 'WITHINGS_CLIENT_ID': 'withings-client-id',
@@ -112,6 +133,10 @@ class Config:
     SQLALCHEMY_DATABASE_URI = db_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Compiled SQL cache entries per engine (SQLAlchemy default 500) - room for every ORM query shape
+    # the dashboard and blueprints build, so hot queries never fall out and recompile
+    SQLALCHEMY_QUERY_CACHE_SIZE = 1200
+    
     # Connection pool settings - only for PostgreSQL, not SQLite
     if db_url and 'postgresql' in db_url:
         # AGGRESSIVE connection pool settings to prevent corruption
@@ -131,12 +156,14 @@ class Config:
                 'keepalives_count': 3
             },
             # Force pool to dispose of connections on error
-            'pool_use_lifo': True  # Use LIFO to keep connections warm
+            'pool_use_lifo': True,  # Use LIFO to keep connections warm
+            'query_cache_size': SQLALCHEMY_QUERY_CACHE_SIZE
         }
     else:
         # SQLite doesn't support connect_timeout or pool settings
         SQLALCHEMY_ENGINE_OPTIONS = {
-            'pool_pre_ping': True
+            'pool_pre_ping': True,
+            'query_cache_size': SQLALCHEMY_QUERY_CACHE_SIZE
         }
     
     SESSION_COOKIE_SECURE = False
@@ -153,6 +180,12 @@ class Config:
     CACHE_TYPE = 'SimpleCache'
     CACHE_DEFAULT_TIMEOUT = 300
     
+    # Request body limits - Werkzeug answers 413 instead of buffering oversized bodies.
+    # MAX_CONTENT_LENGTH applies app-wide (file uploads included); routes decorated with
+    # @small_json_body (SMS, invite, call and video-call-log) are held to MAX_JSON_CONTENT_LENGTH
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB, matches company asset uploads
+    MAX_JSON_CONTENT_LENGTH = 1 * 1024 * 1024  # 1MB
+    
     WITHINGS_CLIENT_ID = os.getenv('WITHINGS_CLIENT_ID', '')
     WITHINGS_CLIENT_SECRET = os.getenv('WITHINGS_CLIENT_SECRET', '')
     WITHINGS_REDIRECT_URI = os.getenv('WITHINGS_REDIRECT_URI', 'https://capturecare-310697189983.australia-southeast2.run.app/withings/callback')
@@ -191,3 +224,57 @@ class Config:
     
     DEFAULT_TIMEZONE = timezone(timedelta(hours=10))
     TIMEZONE_NAME = 'Australia/Sydney'
+
+
+def refresh_config():
+    """
+    Reload secrets from Secret Manager if the last load is older than SECRET_REFRESH_INTERVAL.
+    
+    Each load is one RPC per secret, so routes call this instead of constructing Config() per
+    request. Without Secret Manager there is nothing to reload.
+    """
+    if not (Config.USE_SECRET_MANAGER and Config.GCP_PROJECT_ID):
+        return
+    with _secrets_lock:
+        if _secrets_loaded_at is None or time.monotonic() - _secrets_loaded_at >= SECRET_REFRESH_INTERVAL:
+            Config()
+
+
+TwilioCredentials = namedtuple('TwilioCredentials', 'account_sid auth_token api_key_sid api_key_secret')
+
+@lru_cache(maxsize=1)
+def _load_twilio_credentials(version):
+    """Read (and strip) Twilio credentials; cached until version (.env mtime or secrets load) changes"""
+    if not Config.USE_SECRET_MANAGER and version:
+        load_dotenv(_env_path, override=True)
+    
+    def read(key):
+        return (os.getenv(key, '') or getattr(Config, key, '') or '').strip()
+    
+    return TwilioCredentials(
+        account_sid=read('TWILIO_ACCOUNT_SID'),
+        auth_token=read('TWILIO_AUTH_TOKEN'),
+        api_key_sid=read('TWILIO_API_KEY_SID'),
+        api_key_secret=read('TWILIO_API_KEY_SECRET')
+    )
+
+def secrets_version():
+    """
+    Key for caches of anything built from secrets: it changes whenever the secrets may have.
+    
+    With Secret Manager this is the time of the last refresh_config() load (refreshing first
+    if it's due); locally it's the .env file's mtime, since the file can be edited while the
+    app runs.
+    """
+    if Config.USE_SECRET_MANAGER:
+        refresh_config()
+        return _secrets_loaded_at
+    
+    try:
+        return os.path.getmtime(_env_path)
+    except OSError:
+        return 0
+
+def get_twilio_credentials():
+    """Get current Twilio credentials, re-read whenever secrets_version() changes"""
+    return _load_twilio_credentials(secrets_version())
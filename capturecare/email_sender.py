@@ -6,9 +6,15 @@ from email import encoders
 from datetime import datetime
 import logging
 import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Reuse a logged-in SMTP connection for this long before reconnecting; providers drop idle
+# sessions after a few minutes, and each reuse is checked with NOOP first
+SMTP_CONNECTION_MAX_AGE = 120  # seconds
+
 class EmailSender:
     def __init__(self, smtp_server, smtp_port, username, password, from_email):
         self.smtp_server = smtp_server
@@ -23,6 +29,12 @@ class EmailSender:
             self.password = ''
         self.from_email = from_email
         
+        # One persistent SMTP session per sender - smtplib.SMTP is not thread-safe, so sends
+        # take turns on it under the lock
+        self._smtp = None
+        self._smtp_opened_at = 0.0
+        self._smtp_lock = threading.Lock()
+        
         # Log configuration status (without exposing password)
         if all([self.smtp_server, self.username, self.password]):
             logger.info(f"✅ EmailSender initialized - Server: {self.smtp_server}:{self.smtp_port}, From: {self.from_email}")
@@ -38,7 +50,7 @@ class EmailSender:
             patient_name: Patient's name
             report_content: HTML content of the report
             subject: Optional email subject
-            attachments: List of dict with keys 'filename' and 'content' (bytes)
+            attachments: List of dict with keys 'filename' and 'content' (bytes or a readable file object)
         """
         if not all([self.smtp_server, self.username, self.password]):
             logger.warning("Email configuration incomplete, skipping send")
@@ -71,6 +83,8 @@ class EmailSender:
                 for attachment in attachments:
                     filename = attachment.get('filename', 'attachment')
                     content = attachment.get('content')
+                    if hasattr(content, 'read'):
+                        content = content.read()
                     
                     if content:
                         part = MIMEBase('application', 'octet-stream')
@@ -80,22 +94,9 @@ class EmailSender:
                         msg.attach(part)
                         logger.info(f"Attached file: {filename}")
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30) as server:
-                logger.info(f"📨 Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
-                server.starttls()
-                logger.info(f"🔐 TLS started")
-                
-                # CRITICAL: Do NOT strip() - preserve spaces in Gmail app passwords
-                # Only replace non-breaking spaces with regular spaces
-                smtp_password = self.password.replace('\xa0', ' ') if self.password else ''
-                
-                logger.info(f"🔑 Logging in as {self.username}...")
-                server.login(self.username, smtp_password)
-                logger.info(f"✅ Login successful")
-                
-                logger.info(f"📤 Sending message to {to_email}...")
-                server.send_message(msg)
-                logger.info(f"✅ Message sent successfully")
+            logger.info(f"📤 Sending message to {to_email}...")
+            self._send_message(msg)
+            logger.info(f"✅ Message sent successfully")
             
             logger.info(f"✅ Health report sent to {to_email} with {len(attachments) if attachments else 0} attachments")
             return True
@@ -127,22 +128,9 @@ class EmailSender:
             body = MIMEText(message, 'plain')
             msg.attach(body)
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30) as server:
-                logger.info(f"📨 Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
-                server.starttls()
-                logger.info(f"🔐 TLS started")
-                
-                # CRITICAL: Do NOT strip() - preserve spaces in Gmail app passwords
-                # Only replace non-breaking spaces with regular spaces
-                smtp_password = self.password.replace('\xa0', ' ') if self.password else ''
-                
-                logger.info(f"🔑 Logging in as {self.username}...")
-                server.login(self.username, smtp_password)
-                logger.info(f"✅ Login successful")
-                
-                logger.info(f"📤 Sending notification to {to_email}...")
-                server.send_message(msg)
-                logger.info(f"✅ Message sent successfully")
+            logger.info(f"📤 Sending notification to {to_email}...")
+            self._send_message(msg)
+            logger.info(f"✅ Message sent successfully")
             
             logger.info(f"✅ Notification sent to {to_email}")
             return True
@@ -160,6 +148,68 @@ class EmailSender:
             logger.error(f"   Traceback: {traceback.format_exc()}")
             return False
     
+    def _send_message(self, msg):
+        """Send msg over the persistent SMTP connection, reconnecting if it was dropped"""
+        with self._smtp_lock:
+            try:
+                self._get_connection().send_message(msg)
+                return
+            except (smtplib.SMTPException, OSError) as e:
+                # The session can die between the liveness check and the send; retry once on a new connection
+                logger.warning(f"⚠️ SMTP send failed ({e}), retrying on a new connection")
+                self._close_connection()
+            except Exception:
+                self._close_connection()
+                raise
+            
+            try:
+                self._get_connection().send_message(msg)
+            except Exception:
+                self._close_connection()
+                raise
+    
+    def _get_connection(self):
+        """Logged-in SMTP connection - the current one if it is fresh and answers NOOP"""
+        if self._smtp is not None:
+            if time.monotonic() - self._smtp_opened_at < SMTP_CONNECTION_MAX_AGE:
+                try:
+                    if self._smtp.noop()[0] == 250:
+                        return self._smtp
+                except (smtplib.SMTPException, OSError):
+                    # Dropped sockets surface as OSError (e.g. ConnectionResetError), not SMTPException
+                    pass
+            self._close_connection()
+        
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        try:
+            logger.info(f"📨 Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
+            server.starttls()
+            logger.info(f"🔐 TLS started")
+            
+            # CRITICAL: Do NOT strip() - preserve spaces in Gmail app passwords
+            # Only replace non-breaking spaces with regular spaces
+            smtp_password = self.password.replace('\xa0', ' ') if self.password else ''
+            
+            logger.info(f"🔑 Logging in as {self.username}...")
+            server.login(self.username, smtp_password)
+            logger.info(f"✅ Login successful")
+        except Exception:
+            server.close()
+            raise
+        
+        self._smtp = server
+        self._smtp_opened_at = time.monotonic()
+        return server
+    
+    def _close_connection(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+    
     def _create_html_email(self, patient_name, report_content):
         html = f"""
         <!DOCTYPE html>
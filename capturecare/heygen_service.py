@@ -1,14 +1,33 @@
 import requests
 import logging
 import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool to api.heygen.com, shared by every HeyGenService instance.
+# Retry only applies to idempotent methods, so video generation (POST) is never resent.
+HEYGEN_POOL_CONNECTIONS = 4
+HEYGEN_POOL_MAXSIZE = 16
+HEYGEN_RETRIES = Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+
+# (connect, read) timeouts in seconds
+HEYGEN_TIMEOUT = (5, 30)
+
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(
+    pool_connections=HEYGEN_POOL_CONNECTIONS,
+    pool_maxsize=HEYGEN_POOL_MAXSIZE,
+    max_retries=HEYGEN_RETRIES
+))
+
 class HeyGenService:
     """Service for generating AI avatar videos using HeyGen API"""
     
-    def __init__(self, api_key):
+    def __init__(self, api_key, session=None):
         self.api_key = api_key
+        self.session = session or http_session
         self.base_url = "https://api.heygen.com"
         self.headers = {
             "X-Api-Key": api_key,
@@ -19,10 +38,10 @@ class HeyGenService:
         """Fetch available avatars from HeyGen"""
         try:
             logger.info(f"📡 Fetching avatars from {self.base_url}/v2/avatars")
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/v2/avatars",
                 headers=self.headers,
-                timeout=30
+                timeout=HEYGEN_TIMEOUT
             )
             response.raise_for_status()
             
@@ -58,18 +77,28 @@ class HeyGenService:
             logger.error(f"❌ Error fetching HeyGen avatars: {e}", exc_info=True)
             raise
     
-    def get_voices(self, language=None):
-        """Fetch available voices from HeyGen"""
+    def get_all_voices(self):
+        """Fetch the full, unfiltered voice list from HeyGen (voices and languages are both derived from it)"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/v2/voices",
                 headers=self.headers,
-                timeout=30
+                timeout=HEYGEN_TIMEOUT
             )
             response.raise_for_status()
             
             data = response.json()
-            voices = data.get('data', {}).get('voices', [])
+            return data.get('data', {}).get('voices', [])
+            
+        except Exception as e:
+            logger.error(f"Error fetching HeyGen voices: {e}")
+            return []
+    
+    def get_voices(self, language=None, voices=None):
+        """Fetch available voices from HeyGen, or filter an already-fetched voice list"""
+        try:
+            if voices is None:
+                voices = self.get_all_voices()
             
             # Log sample voices for debugging
             if voices and not language:
@@ -126,18 +155,11 @@ class HeyGenService:
             logger.error(f"Error fetching HeyGen voices: {e}")
             return []
     
-    def get_languages(self):
-        """Fetch available voice languages/locales from HeyGen"""
+    def get_languages(self, voices=None):
+        """Fetch available voice languages/locales from HeyGen, or derive them from an already-fetched voice list"""
         try:
-            response = requests.get(
-                f"{self.base_url}/v2/voices",
-                headers=self.headers,
-                timeout=30
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            voices = data.get('data', {}).get('voices', [])
+            if voices is None:
+                voices = self.get_all_voices()
             
             # Extract unique languages from voices
             languages_set = set()
@@ -164,7 +186,8 @@ class HeyGenService:
             return []
     
     def generate_video(self, script, avatar_id=None, voice_id=None, voice_gender=None, 
-                       voice_language="English", voice_speed=1.0, title="Health Report"):
+                       voice_language="English", voice_speed=1.0, title="Health Report",
+                       voices=None, avatars=None):
         """
         Generate an AI avatar video from script
         
@@ -176,6 +199,8 @@ class HeyGenService:
             voice_language: Voice language (default: "English")
             voice_speed: Speech speed multiplier (default: 1.0)
             title: Video title
+            voices: Full voice list to auto-select from (fetched from HeyGen if None)
+            avatars: Avatar list to auto-select from (fetched from HeyGen if None)
             
         Returns:
             dict with video_id and status, or None if error
@@ -188,7 +213,7 @@ class HeyGenService:
             
             # Auto-select voice if not provided
             if not voice_id:
-                voices = self.get_voices(voice_language)
+                voices = self.get_voices(voice_language, voices=voices)
                 
                 # Filter by gender if specified
                 if voice_gender and voices:
@@ -206,7 +231,8 @@ class HeyGenService:
             
             # Use default avatar if not provided
             if not avatar_id:
-                avatars = self.get_avatars()
+                if avatars is None:
+                    avatars = self.get_avatars()
                 
                 # Try to find a nurse/medical professional avatar
                 medical_avatars = [a for a in avatars if 'nurse' in a.get('avatar_name', '').lower() 
@@ -252,11 +278,11 @@ class HeyGenService:
             }
             
             # Generate video
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/v2/video/generate",
                 headers=self.headers,
                 json=payload,
-                timeout=30
+                timeout=HEYGEN_TIMEOUT
             )
             response.raise_for_status()
             
@@ -293,11 +319,11 @@ class HeyGenService:
             dict with status and video_url (if completed)
         """
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/v1/video_status.get",
                 params={"video_id": video_id},
                 headers=self.headers,
-                timeout=30
+                timeout=HEYGEN_TIMEOUT
             )
             response.raise_for_status()
             
@@ -0,0 +1,36 @@
+"""
+orjson-backed JSON provider for CaptureCare
+Replaces Flask's stdlib json encoder so jsonify() serializes rows and datetimes natively
+"""
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Naive datetimes are emitted exactly like datetime.isoformat(), which is what every
+# endpoint produced by hand before; non-str keys mirror the stdlib encoder behaviour
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes with orjson and falls back to Flask's defaults for unknown types"""
+
+    def dumps(self, obj, **kwargs):
+        # orjson has no equivalent for stdlib options (indent, cls, separators...), so honour them the slow way
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj, option=ORJSON_OPTIONS):
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def response(self, *args, **kwargs):
+        """jsonify(): hand orjson's bytes straight to the response instead of decoding to str and re-encoding"""
+        obj = self._prepare_response_obj(args, kwargs)
+        option = ORJSON_OPTIONS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            option |= orjson.OPT_INDENT_2
+        return self._app.response_class(self.dumps_bytes(obj, option), mimetype=self.mimetype)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
@@ -73,9 +73,36 @@ class Patient(db.Model):
     invoices = db.relationship('Invoice', backref='patient', lazy=True, cascade='all, delete-orphan')
     correspondence = db.relationship('PatientCorrespondence', backref='patient', lazy=True, cascade='all, delete-orphan')
     
+    # Case-insensitive email lookups (webhook/Cliniko duplicate checks) use this functional index;
+    # inbound SMS matching compares digits-only phone numbers (Postgres expression indexes);
+    # substring ILIKE '%term%' searches on name/email are served by pg_trgm GIN indexes
+    __table_args__ = (
+        db.Index('idx_patients_email_lower', db.func.lower(email)),
+        db.Index('idx_patients_mobile_digits', db.func.regexp_replace(mobile, '[^0-9]', '', 'g')).ddl_if(dialect='postgresql'),
+        db.Index('idx_patients_phone_digits', db.func.regexp_replace(phone, '[^0-9]', '', 'g')).ddl_if(dialect='postgresql'),
+        db.Index(
+            'idx_patients_first_name_trgm', first_name,
+            postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'idx_patients_last_name_trgm', last_name,
+            postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+        db.Index(
+            'idx_patients_email_trgm', email,
+            postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+    
     def __repr__(self):
         return f'<Patient {self.first_name} {self.last_name}>'
 
+# The trigram indexes above need pg_trgm, so make sure it exists before create_all() builds them
+db.event.listen(
+    Patient.__table__, 'before_create',
+    db.DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
 class HealthData(db.Model):
     __tablename__ = 'health_data'
     
@@ -229,6 +256,11 @@ class Appointment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('idx_appointments_practitioner_patient_start', practitioner_id, patient_id, start_time),
+        db.Index('idx_appointments_practitioner_start', practitioner_id, start_time),
+    )
+    
     patient_notes = db.relationship('PatientNote', backref='appointment', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
@@ -548,6 +580,42 @@ class PatientCorrespondence(db.Model):
     # Soft delete
     is_deleted = db.Column(db.Boolean, default=False)
     
+    # Per-patient listing (non-deleted, newest first) is served straight from this partial index,
+    # the all-correspondence inbox seeks by (sent_at, id) and filters by channel/direction/workflow
+    # status in sent order; Twilio webhooks look rows up by call/message SID (most rows have neither, hence partial)
+    __table_args__ = (
+        db.Index(
+            'idx_correspondence_patient_active_sent',
+            patient_id, sent_at.desc(),
+            postgresql_where=(is_deleted == False),
+            sqlite_where=(is_deleted == False)
+        ),
+        db.Index(
+            'idx_correspondence_active_sent_id',
+            sent_at.desc(), id.desc(),
+            postgresql_where=(is_deleted == False),
+            sqlite_where=(is_deleted == False)
+        ),
+        db.Index(
+            'idx_correspondence_active_filters_sent',
+            channel, direction, workflow_status, sent_at.desc(),
+            postgresql_where=(is_deleted == False),
+            sqlite_where=(is_deleted == False)
+        ),
+        db.Index(
+            'idx_correspondence_call_sid',
+            call_sid,
+            postgresql_where=call_sid.isnot(None),
+            sqlite_where=call_sid.isnot(None)
+        ),
+        db.Index(
+            'idx_correspondence_external_id',
+            external_id,
+            postgresql_where=external_id.isnot(None),
+            sqlite_where=external_id.isnot(None)
+        ),
+    )
+    
     def __repr__(self):
         return f'<Correspondence {self.channel} {self.direction} to Patient {self.patient_id}>'
 
@@ -584,6 +652,12 @@ class CommunicationWebhookLog(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # The webhook log viewer lists the most recent entries, optionally for one webhook type
+    __table_args__ = (
+        db.Index('idx_comm_webhook_logs_created', created_at.desc()),
+        db.Index('idx_comm_webhook_logs_type_created', webhook_type, created_at.desc()),
+    )
+    
     def __repr__(self):
         return f'<CommunicationWebhookLog {self.webhook_type} - {"Success" if self.success else "Failed"}>'
 
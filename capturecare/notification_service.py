@@ -1,13 +1,18 @@
 import os
 import logging
 import smtplib
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from .config import Config
+from .config import Config, secrets_version
 
 logger = logging.getLogger(__name__)
 
+# Twilio HTTP connection pool - keeps TLS connections to api.twilio.com alive between requests
+TWILIO_POOL_CONNECTIONS = 10
+TWILIO_POOL_MAXSIZE = 50
+
 class NotificationService:
     """Service for sending SMS and email notifications"""
     
@@ -16,19 +21,20 @@ class NotificationService:
     
     def _initialize_services(self):
         """Initialize or reinitialize services with current config"""
-        # Reload config from environment
-        from importlib import reload
-        from . import config
-        reload(config)
-        from .config import Config
-        
         self.twilio_configured = bool(Config.TWILIO_ACCOUNT_SID and Config.TWILIO_AUTH_TOKEN and Config.TWILIO_PHONE_NUMBER)
         self.smtp_configured = bool(Config.SMTP_USERNAME and Config.SMTP_PASSWORD)
         
         if self.twilio_configured:
             try:
                 from twilio.rest import Client
-                self.twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN)
+                from twilio.http.http_client import TwilioHttpClient
+                from requests.adapters import HTTPAdapter
+                http_client = TwilioHttpClient(pool_connections=True)
+                http_client.session.mount('https://', HTTPAdapter(
+                    pool_connections=TWILIO_POOL_CONNECTIONS,
+                    pool_maxsize=TWILIO_POOL_MAXSIZE
+                ))
+                self.twilio_client = Client(Config.TWILIO_ACCOUNT_SID, Config.TWILIO_AUTH_TOKEN, http_client=http_client)
                 self.twilio_phone = Config.TWILIO_PHONE_NUMBER
                 logger.info("✅ Twilio SMS service initialized")
             except ImportError:
@@ -82,7 +88,7 @@ class NotificationService:
         # Otherwise assume Australian mobile/landline - add +61
         return '+61' + phone
     
-    def send_sms(self, to_phone, message, patient_id=None, user_id=None, log_correspondence=True):
+    def send_sms(self, to_phone, message, patient_id=None, user_id=None, log_correspondence=True, defer_commit=False, log_failure=True):
         """
         Send SMS via Twilio
         
@@ -92,6 +98,8 @@ class NotificationService:
             patient_id (int, optional): Patient ID for logging correspondence
             user_id (int, optional): User ID for logging correspondence
             log_correspondence (bool): Whether to log to correspondence table (default: True)
+            defer_commit (bool): Add the correspondence row without committing - the caller commits (default: False)
+            log_failure (bool): Also log a failed send - False when the caller will retry it (default: True)
             
         Returns:
             dict: {'success': bool, 'sid': str, 'status': str, 'error': str}
@@ -125,7 +133,8 @@ class NotificationService:
                     recipient_phone=formatted_phone,
                     message=message,
                     status='sent',  # Show as 'sent' instead of 'queued' since message was successfully sent
-                    external_id=message_obj.sid
+                    external_id=message_obj.sid,
+                    commit=not defer_commit
                 )
             
             return {
@@ -139,22 +148,23 @@ class NotificationService:
             logger.error(f"❌ Error sending SMS to {to_phone}: {e}")
             
             # Log failed correspondence if patient_id provided
-            if log_correspondence and patient_id:
+            if log_correspondence and log_failure and patient_id:
                 self._log_sms_correspondence(
                     patient_id=patient_id,
                     user_id=user_id,
                     recipient_phone=to_phone,
                     message=message,
                     status='failed',
-                    error_message=str(e)
+                    error_message=str(e),
+                    commit=not defer_commit
                 )
             
             return {'success': False, 'error': str(e)}
     
-    def _log_sms_correspondence(self, patient_id, recipient_phone, message, status, user_id=None, external_id=None, error_message=None):
+    def _log_sms_correspondence(self, patient_id, recipient_phone, message, status, user_id=None, external_id=None, error_message=None, commit=True):
         """Log SMS correspondence to database"""
         try:
-            from models import db, PatientCorrespondence
+            from .models import db, PatientCorrespondence
             from datetime import datetime
             import psycopg2
             
@@ -173,7 +183,8 @@ class NotificationService:
             )
             
             db.session.add(correspondence)
-            db.session.commit()
+            if commit:
+                db.session.commit()
             logger.info(f"✅ Logged SMS correspondence for patient {patient_id}")
             
         except Exception as e:
@@ -183,7 +194,7 @@ class NotificationService:
                 logger.warning(f"⚠️  Duplicate key error when logging SMS correspondence. This may indicate a sequence issue. Error: {e}")
                 # Try to fix the sequence by getting max ID and setting it
                 try:
-                    from models import db, PatientCorrespondence
+                    from .models import db, PatientCorrespondence
                     max_id = db.session.query(db.func.max(PatientCorrespondence.id)).scalar() or 0
                     db.session.execute(db.text(f"SELECT setval('patient_correspondence_id_seq', {max_id + 1}, false)"))
                     db.session.commit()
@@ -199,7 +210,7 @@ class NotificationService:
             except:
                 pass
     
-    def send_email(self, to_email, subject, body_html, body_text=None, patient_id=None, user_id=None, log_correspondence=True):
+    def send_email(self, to_email, subject, body_html, body_text=None, patient_id=None, user_id=None, log_correspondence=True, defer_commit=False, log_failure=True):
         """
         Send email via SMTP
         
@@ -211,6 +222,8 @@ class NotificationService:
             patient_id (int, optional): Patient ID for logging correspondence
             user_id (int, optional): User ID for logging correspondence
             log_correspondence (bool): Whether to log to correspondence table (default: True)
+            defer_commit (bool): Add the correspondence row without committing - the caller commits (default: False)
+            log_failure (bool): Also log a failed send - False when the caller will retry it (default: True)
             
         Returns:
             bool: True if sent successfully, False otherwise
@@ -257,7 +270,8 @@ class NotificationService:
                     recipient_email=to_email,
                     subject=subject,
                     body=body_text or body_html,
-                    status='delivered'
+                    status='delivered',
+                    commit=not defer_commit
                 )
             
             return True
@@ -266,7 +280,7 @@ class NotificationService:
             logger.error(f"❌ Error sending email to {to_email}: {e}")
             
             # Log failed correspondence if patient_id provided
-            if log_correspondence and patient_id:
+            if log_correspondence and log_failure and patient_id:
                 self._log_email_correspondence(
                     patient_id=patient_id,
                     user_id=user_id,
@@ -274,15 +288,16 @@ class NotificationService:
                     subject=subject,
                     body=body_text or body_html,
                     status='failed',
-                    error_message=str(e)
+                    error_message=str(e),
+                    commit=not defer_commit
                 )
             
             return False
     
-    def _log_email_correspondence(self, patient_id, recipient_email, subject, body, status, user_id=None, error_message=None):
+    def _log_email_correspondence(self, patient_id, recipient_email, subject, body, status, user_id=None, error_message=None, commit=True):
         """Log email correspondence to database"""
         try:
-            from models import db, PatientCorrespondence
+            from .models import db, PatientCorrespondence
             from datetime import datetime
             
             correspondence = PatientCorrespondence(
@@ -300,7 +315,8 @@ class NotificationService:
             )
             
             db.session.add(correspondence)
-            db.session.commit()
+            if commit:
+                db.session.commit()
             logger.info(f"✅ Logged email correspondence for patient {patient_id}")
             
         except Exception as e:
@@ -339,7 +355,6 @@ class NotificationService:
             logger.info(f"📞 Initiating call to: {formatted_phone}")
             
             # Get base URL for webhooks (from config or use default)
-            from config import Config
             base_url = os.getenv('BASE_URL', 'http://localhost:5000')
             
             # If no TwiML URL provided, use inline TwiML to simply ring/dial
@@ -412,7 +427,7 @@ class NotificationService:
                                   transcription_status=None, error_message=None, sender_phone=None):
         """Log voice call correspondence to database"""
         try:
-            from models import db, PatientCorrespondence, PatientNote
+            from .models import db, PatientCorrespondence, PatientNote
             from datetime import datetime
             
             # Use transcript as body if available, otherwise use placeholder
@@ -540,7 +555,7 @@ class NotificationService:
             note_text = "\n".join(note_parts)
             
             # Create patient note
-            from models import db, PatientNote
+            from .models import db, PatientNote
             note = PatientNote(
                 patient_id=patient_id,
                 note_text=note_text,
@@ -575,7 +590,7 @@ class NotificationService:
         Returns:
             dict: Status of SMS and email sending
         """
-        from models import NotificationTemplate
+        from .models import NotificationTemplate
         
         start_time = appointment.start_time.strftime('%B %d, %Y at %I:%M %p')
         start_time_short = appointment.start_time.strftime('%d/%m/%Y at %I:%M %p')
@@ -718,7 +733,7 @@ This is an automated message from CaptureCare® - Humanising Digital Health.
         Returns:
             dict: Status of SMS sending
         """
-        from models import NotificationTemplate
+        from .models import NotificationTemplate
         
         start_time = appointment.start_time.strftime('%B %d, %Y at %I:%M %p')
         start_time_short = appointment.start_time.strftime('%d/%m/%Y at %I:%M %p')
@@ -867,3 +882,17 @@ This is an automated message from CaptureCare® - Humanising Digital Health.
             logger.info(f"No email for patient {patient_name} - skipping email")
         
         return result
+
+
+@lru_cache(maxsize=1)
+def _notification_service_for(version):
+    return NotificationService()
+
+def get_notification_service():
+    """
+    Process-wide NotificationService, so the Twilio client and its connection pool are reused.
+    
+    Keyed on secrets_version() like get_twilio_credentials(), so rotated Twilio/SMTP secrets
+    get a new service (and client) once they are reloaded.
+    """
+    return _notification_service_for(secrets_version())
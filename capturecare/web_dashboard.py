@@ -1,30 +1,55 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, Response, send_file
+from flask import Flask, render_template, request, redirect, url_for, jsonify, session, flash, Response, send_file, stream_with_context, abort
 from werkzeug.exceptions import HTTPException
+from werkzeug.security import generate_password_hash
 from flask_cors import CORS
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from datetime import datetime, timedelta
-from sqlalchemy import or_
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import raiseload
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from .models import db, Patient, HealthData, Device, User, TargetRange, Appointment, PatientNote, WebhookLog, Invoice, InvoiceItem, PatientCorrespondence, CommunicationWebhookLog, NotificationTemplate, AvailabilityPattern, AvailabilityException, PatientAuth, OnboardingChecklist, CompanyAsset
-from .config import Config
+from .config import Config, get_twilio_credentials, refresh_config
 from .withings_auth import WithingsAuthManager
 from .sync_health_data import HealthDataSynchronizer
 from .patient_matcher import ClinikoIntegration
 from .ai_health_reporter import AIHealthReporter
 from .email_sender import EmailSender
 from .calendar_sync import GoogleCalendarSync
-from .notification_service import NotificationService
+from .notification_service import get_notification_service
 from .heygen_service import HeyGenService
 from .stripe_service import StripeService
 import logging
 import os
 import json
+import orjson
+import hashlib
+import gzip
+import threading
+import hmac
+import base64
+import re
+import tempfile
+import traceback
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import smtplib
 import jwt
 import secrets
-from functools import wraps
+import string
+import uuid
+from functools import wraps, lru_cache, partial
+from collections import defaultdict
 from flask_migrate import Migrate
+import openai
+from twilio.rest import Client
+from twilio.request_validator import RequestValidator
+from twilio.jwt.access_token import AccessToken
+from twilio.jwt.access_token.grants import VideoGrant
 from .extensions import cache
+from .background import BatchedInsertWriter, BackgroundTaskRunner
+from .json_provider import ORJSONProvider
 from .blueprints.admin import admin_bp
 from .blueprints.api import api_bp
 from .blueprints.auth import auth_bp
@@ -74,6 +99,7 @@ if os.path.exists(env_file_path):
     logger.info(f"🔑 HeyGen API configured: {bool(os.getenv('HEYGEN_API_KEY'))}")
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 config = Config()
 app.config.from_object(config)
 
@@ -83,6 +109,10 @@ for key in dir(config):
     if key.isupper() and not key.startswith('_'):
         app.config[key] = getattr(config, key)
 
+# Public base URL for patient-facing links (video rooms), read once at startup;
+# when empty, routes fall back to the request host
+PUBLIC_BASE_URL = app.config.get('BASE_URL', '') or os.getenv('BASE_URL', '') or os.getenv('PUBLIC_URL', '')
+
 # Initialize Cache
 cache.init_app(app)
 
@@ -121,6 +151,15 @@ def handle_exception(e):
         return e
     return jsonify({'error': 'Internal server error', 'message': str(e)}), 500
 
+def small_json_body(f):
+    """413 for a request body larger than MAX_JSON_CONTENT_LENGTH, before it is read - for routes that take a few small fields"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if (request.content_length or 0) > app.config['MAX_JSON_CONTENT_LENGTH']:
+            abort(413)
+        return f(*args, **kwargs)
+    return decorated_function
+
 app.secret_key = app.config['SECRET_KEY']
 
 # CRITICAL: Initialize database BEFORE registering blueprints
@@ -164,7 +203,6 @@ except Exception as e:
 def ensure_admin_user():
     """Ensure the admin user exists with correct credentials"""
     try:
-        from werkzeug.security import generate_password_hash
         admin = User.query.filter_by(username='iwizz').first()
         if not admin:
             logger.info("Creating admin user 'iwizz'...")
@@ -277,7 +315,7 @@ except Exception as e:
     calendar_sync = None
     logger.warning(f"Google Calendar integration not available: {e}")
 
-notification_service = NotificationService()
+notification_service = get_notification_service()
 
 heygen = HeyGenService(
     app.config.get('HEYGEN_API_KEY')
@@ -311,7 +349,6 @@ with app.app_context():
             logger.info("Production mode: Skipping default admin user creation")
     except Exception as e:
         logger.error(f"❌ Error during database initialization: {e}")
-        import traceback
         traceback.print_exc()
 
 # Add Jinja2 template filters for Australian timezone formatting
@@ -342,7 +379,6 @@ def create_user():
         return jsonify({'success': False, 'error': 'Admin access required'}), 403
     
     try:
-        import secrets
         data = request.get_json()
         
         if User.query.filter_by(username=data['username']).first():
@@ -699,7 +735,7 @@ def patient_detail(patient_id):
     practitioners = User.query.filter_by(is_active=True).order_by(User.first_name).all()
     
     # Get public base URL for video room links
-    base_url = app.config.get('BASE_URL', '') or os.getenv('BASE_URL', '') or os.getenv('PUBLIC_URL', '')
+    base_url = PUBLIC_BASE_URL
     
     # Get or create onboarding checklist for this patient
     onboarding_checklist = OnboardingChecklist.query.filter_by(patient_id=patient_id).first()
@@ -1034,7 +1070,6 @@ Only include min/max for ranges, or target for single values. Base recommendatio
             logger.error(f"❌ Failed to initialize AI reporter - client: {reporter_to_use.client if reporter_to_use else 'None'}")
             return jsonify({'success': False, 'error': 'Failed to initialize AI client. Please check your API key in Settings.'}), 500
         
-        import json
         response = reporter_to_use.client.chat.completions.create(
             model=reporter_to_use.model,
             messages=[{"role": "user", "content": prompt}],
@@ -1174,7 +1209,6 @@ def get_heart_rate_data(patient_id):
     
     except Exception as e:
         logger.error(f"Error fetching heart rate data: {e}", exc_info=True)
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         try:
@@ -1246,7 +1280,6 @@ def get_heart_rate_daily_minmax(patient_id):
     
     except Exception as e:
         logger.error(f"Error fetching daily min/max heart rate: {e}", exc_info=True)
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         try:
@@ -1354,13 +1387,20 @@ def api_get_patient(patient_id):
         logger.error(f"Error getting patient {patient_id}: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Rows fetched per round trip when streaming whole-table patient scans
+PATIENT_SCAN_BATCH_SIZE = 1000
+
 @app.route('/api/patients/list', methods=['GET'])
 @optional_login_required
 def api_list_patients():
     """Get list of all patients for dropdowns"""
     try:
-        # Get all patients, ordered by name
-        patients = Patient.query.order_by(Patient.first_name, Patient.last_name).all()
+        # Get all patients, ordered by name - only the dropdown columns, streamed as plain
+        # rows in batches so no ORM instances are built or tracked for the whole table
+        patients = Patient.query.with_entities(
+            Patient.id, Patient.first_name, Patient.last_name,
+            Patient.phone, Patient.mobile, Patient.email
+        ).order_by(Patient.first_name, Patient.last_name).yield_per(PATIENT_SCAN_BATCH_SIZE)
         
         return jsonify({
             'success': True,
@@ -1440,6 +1480,26 @@ def api_sync_all():
     results = synchronizer.sync_all_patients(days_back=1)
     return jsonify(results)
 
+# WebhookLog rows are batched and inserted off the request thread
+webhook_log_writer = BatchedInsertWriter(WebhookLog.__table__)
+webhook_log_writer.init_app(app)
+
+# Field-spec tables for webhook_add_patient: optional text fields are stripped (blank -> None),
+# boolean fields accept yes/true/1/on strings, array fields are joined into comma-separated text
+WEBHOOK_PATIENT_STR_FIELDS = (
+    'phone', 'mobile', 'sex',
+    'address_line1', 'address_line2', 'city', 'state', 'postcode',
+    'emergency_contact_name', 'emergency_contact_phone', 'emergency_contact_email', 'emergency_contact_relationship',
+    'gp_name', 'gp_address', 'gp_phone',
+    'current_medications', 'occupation', 'medicare_number', 'dva_number', 'medical_alerts'
+)
+WEBHOOK_PATIENT_BOOL_FIELDS = ('emergency_contact_consent', 'has_gp', 'owns_smart_device')
+WEBHOOK_PATIENT_ARRAY_FIELDS = ('health_focus_areas',)
+
+def find_patient_by_email(email):
+    """Patient whose email matches case-insensitively (an index lookup on idx_patients_email_lower)"""
+    return Patient.query.filter(db.func.lower(Patient.email) == email.lower()).first()
+
 @app.route('/api/webhook/patient', methods=['POST'])
 def webhook_add_patient():
     """
@@ -1562,43 +1622,19 @@ def webhook_add_patient():
             logger.warning(f"Webhook missing required fields: {missing_fields}")
             
             # Log failure
-            webhook_log = WebhookLog(
+            webhook_log_writer.put(dict(
                 success=False,
                 email=data.get('email'),
                 error_message=f'Missing required fields: {", ".join(missing_fields)}',
-                request_data=str(data)
-            )
-            db.session.add(webhook_log)
-            db.session.commit()
+                request_data=orjson.dumps(data, default=str).decode(),
+                created_at=datetime.utcnow()
+            ))
             
             return jsonify({
                 'success': False,
                 'error': f'Missing required fields: {", ".join(missing_fields)}'
             }), 400
         
-        # Check if patient with this email already exists
-        existing_patient = Patient.query.filter_by(email=data['email']).first()
-        if existing_patient:
-            logger.warning(f"Webhook: Patient with email {data['email']} already exists")
-            
-            # Log duplicate
-            webhook_log = WebhookLog(
-                success=False,
-                patient_id=existing_patient.id,
-                patient_name=f"{existing_patient.first_name} {existing_patient.last_name}",
-                email=data['email'],
-                error_message='Patient with this email already exists',
-                request_data=str(data)
-            )
-            db.session.add(webhook_log)
-            db.session.commit()
-            
-            return jsonify({
-                'success': False,
-                'error': 'Patient with this email already exists',
-                'patient_id': existing_patient.id
-            }), 409
-        
         # Parse date of birth if provided
         date_of_birth = None
         if data.get('date_of_birth'):
@@ -1625,69 +1661,82 @@ def webhook_add_patient():
                 return ', '.join(str(v) for v in value)
             return value if value else None
         
-        # Map 'suburb' to 'city' if provided
-        city_value = data.get('city', '').strip() or None
-        
-        # Create new patient with all fields
-        patient = Patient(
+        # Build Patient kwargs from the field-spec tables ('suburb' was already mapped to 'city')
+        patient_fields = {field: (data.get(field) or '').strip() or None for field in WEBHOOK_PATIENT_STR_FIELDS}
+        patient_fields.update({field: parse_bool(data.get(field, False)) for field in WEBHOOK_PATIENT_BOOL_FIELDS})
+        patient_fields.update({field: parse_array(data.get(field)) for field in WEBHOOK_PATIENT_ARRAY_FIELDS})
+        patient_fields.update(
             first_name=data['first_name'].strip(),
             last_name=data['last_name'].strip(),
             email=data['email'].strip().lower(),
             date_of_birth=date_of_birth,
-            phone=data.get('phone', '').strip() or None,
-            mobile=data.get('mobile', '').strip() or None,
-            sex=data.get('sex', '').strip() or None,
-            address_line1=data.get('address_line1', '').strip() or None,
-            address_line2=data.get('address_line2', '').strip() or None,
-            city=city_value,
-            state=data.get('state', '').strip() or None,
-            postcode=data.get('postcode', '').strip() or None,
-            country=data.get('country', '').strip() or 'Australia',
-            emergency_contact_name=data.get('emergency_contact_name', '').strip() or None,
-            emergency_contact_phone=data.get('emergency_contact_phone', '').strip() or None,
-            emergency_contact_email=data.get('emergency_contact_email', '').strip() or None,
-            emergency_contact_relationship=data.get('emergency_contact_relationship', '').strip() or None,
-            emergency_contact_consent=parse_bool(data.get('emergency_contact_consent', False)),
-            gp_name=data.get('gp_name', '').strip() or None,
-            gp_address=data.get('gp_address', '').strip() or None,
-            gp_phone=data.get('gp_phone', '').strip() or None,
-            has_gp=parse_bool(data.get('has_gp', False)),
-            current_medications=data.get('current_medications', '').strip() or None,
-            owns_smart_device=parse_bool(data.get('owns_smart_device', False)),
-            health_focus_areas=parse_array(data.get('health_focus_areas')),
-            occupation=data.get('occupation', '').strip() or None,
-            medicare_number=data.get('medicare_number', '').strip() or None,
-            dva_number=data.get('dva_number', '').strip() or None,
-            notes=data.get('notes', '').strip() or data.get('digital_signature', '').strip() or None,
-            medical_alerts=data.get('medical_alerts', '').strip() or None,
+            country=(data.get('country') or '').strip() or 'Australia',
+            notes=(data.get('notes') or '').strip() or (data.get('digital_signature') or '').strip() or None,
             terms_consent=parse_bool(data.get('terms_consent', False) or data.get('agreeterms', False))
         )
         
-        db.session.add(patient)
+        # Case-insensitive duplicate check (idx_patients_email_lower), then a single-statement
+        # INSERT ... ON CONFLICT (email) DO NOTHING RETURNING id - a concurrent webhook call that
+        # inserted the same email in between returns no row instead of raising
+        existing_patient = find_patient_by_email(patient_fields['email'])
+        patient_id = None
+        if existing_patient is None:
+            patient_insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+            patient_id = db.session.execute(
+                patient_insert(Patient).values(**patient_fields)
+                .on_conflict_do_nothing(index_elements=[Patient.email])
+                .returning(Patient.id)
+            ).scalar()
+            if patient_id is None:
+                existing_patient = find_patient_by_email(patient_fields['email'])
+                if existing_patient is None:
+                    raise RuntimeError(f"Patient insert for {patient_fields['email']} conflicted but no patient has that email")
+        
+        if existing_patient is not None:
+            logger.warning(f"Webhook: Patient with email {data['email']} already exists")
+            
+            # Log duplicate
+            webhook_log_writer.put(dict(
+                success=False,
+                patient_id=existing_patient.id if existing_patient else None,
+                patient_name=f"{existing_patient.first_name} {existing_patient.last_name}" if existing_patient else None,
+                email=data['email'],
+                error_message='Patient with this email already exists',
+                request_data=orjson.dumps(data, default=str).decode(),
+                created_at=datetime.utcnow()
+            ))
+            
+            return jsonify({
+                'success': False,
+                'error': 'Patient with this email already exists',
+                'patient_id': existing_patient.id if existing_patient else None
+            }), 409
+        
+        patient_name = f"{patient_fields['first_name']} {patient_fields['last_name']}"
+        
         db.session.commit()
         
-        # Log success
-        webhook_log = WebhookLog(
+        # Log success (written in the background so the response doesn't wait on it)
+        webhook_log_writer.put(dict(
             success=True,
-            patient_id=patient.id,
-            patient_name=f"{patient.first_name} {patient.last_name}",
-            email=patient.email,
-            request_data=str(data)
-        )
-        db.session.add(webhook_log)
-        db.session.commit()
+            patient_id=patient_id,
+            patient_name=patient_name,
+            email=patient_fields['email'],
+            request_data=orjson.dumps(data, default=str).decode(),
+            created_at=datetime.utcnow()
+        ))
         
-        logger.info(f"✅ Webhook: Successfully created patient {patient.id} - {patient.first_name} {patient.last_name}")
+        logger.info(f"✅ Webhook: Successfully created patient {patient_id} - {patient_name}")
         
         return jsonify({
             'success': True,
             'message': 'Patient created successfully',
-            'patient_id': patient.id,
+            'patient_id': patient_id,
             'patient': {
-                'id': patient.id,
-                'first_name': patient.first_name,
-                'last_name': patient.last_name,
-                'email': patient.email
+                'id': patient_id,
+                'first_name': patient_fields['first_name'],
+                'last_name': patient_fields['last_name'],
+                'email': patient_fields['email']
             }
         }), 201
         
@@ -1697,13 +1746,12 @@ def webhook_add_patient():
         
         # Log error
         try:
-            webhook_log = WebhookLog(
+            webhook_log_writer.put(dict(
                 success=False,
                 error_message=str(e),
-                request_data=str(data) if 'data' in locals() else 'No data'
-            )
-            db.session.add(webhook_log)
-            db.session.commit()
+                request_data=orjson.dumps(data, default=str).decode() if 'data' in locals() else 'No data',
+                created_at=datetime.utcnow()
+            ))
         except:
             pass
         
@@ -1717,21 +1765,20 @@ def webhook_add_patient():
 def get_webhook_logs():
     """Get recent webhook activity logs"""
     try:
-        logs = WebhookLog.query.order_by(WebhookLog.created_at.desc()).limit(20).all()
-        
-        logs_data = []
-        for log in logs:
-            logs_data.append({
-                'id': log.id,
-                'success': log.success,
-                'patient_id': log.patient_id,
-                'patient_name': log.patient_name,
-                'email': log.email,
-                'error': log.error_message,
-                'timestamp': log.created_at.isoformat() if log.created_at else None
-            })
-        
-        return jsonify({'logs': logs_data})
+        # Column labels match the response keys, so rows serialize directly with no per-row dict building
+        logs = db.session.execute(
+            db.select(
+                WebhookLog.id,
+                WebhookLog.success,
+                WebhookLog.patient_id,
+                WebhookLog.patient_name,
+                WebhookLog.email,
+                WebhookLog.error_message.label('error'),
+                WebhookLog.created_at.label('timestamp')
+            ).order_by(WebhookLog.created_at.desc()).limit(20)
+        ).mappings().all()
+        
+        return jsonify({'logs': [dict(log) for log in logs]})
     except Exception as e:
         logger.error(f"Error fetching webhook logs: {e}", exc_info=True)
         # Return empty logs array instead of error to prevent frontend issues
@@ -1739,44 +1786,74 @@ def get_webhook_logs():
         return jsonify({'logs': [], 'error': str(e)}), 200  # Return 200 with empty logs
 
 
+def invoice_listing_query(patient_id):
+    """Core select for a patient's invoice listing (plain rows, newest first)"""
+    return db.select(
+        Invoice.id,
+        Invoice.invoice_number,
+        Invoice.invoice_type,
+        Invoice.status,
+        Invoice.total_amount,
+        Invoice.amount_paid,
+        Invoice.currency,
+        Invoice.invoice_date,
+        Invoice.due_date,
+        Invoice.paid_date,
+        Invoice.description,
+        Invoice.is_recurring,
+        Invoice.recurring_frequency,
+        Invoice.next_billing_date,
+        Invoice.stripe_hosted_invoice_url,
+        Invoice.stripe_invoice_pdf
+    ).where(Invoice.patient_id == patient_id).order_by(Invoice.created_at.desc())
+
+def load_invoice_items(invoices):
+    """Fetch line items for a batch of invoice rows in one query, returned as the rows with 'items' attached"""
+    items_by_invoice = {}
+    if invoices:
+        items = db.session.execute(
+            db.select(
+                InvoiceItem.invoice_id,
+                InvoiceItem.description,
+                InvoiceItem.quantity,
+                InvoiceItem.unit_price,
+                InvoiceItem.tax_rate,
+                InvoiceItem.amount
+            ).where(InvoiceItem.invoice_id.in_([inv['id'] for inv in invoices])).order_by(InvoiceItem.id)
+        ).mappings()
+        for item in items:
+            items_by_invoice.setdefault(item['invoice_id'], []).append({
+                'description': item['description'],
+                'quantity': item['quantity'],
+                'unit_price': item['unit_price'],
+                'tax_rate': item['tax_rate'],
+                'amount': item['amount']
+            })
+    
+    return [{**inv, 'items': items_by_invoice.get(inv['id'], [])} for inv in invoices]
+
 @app.route('/patients/<int:patient_id>/invoices', methods=['GET'])
 @optional_login_required
 def get_patient_invoices(patient_id):
-    """Get all invoices for a patient"""
+    """Get invoices for a patient (optionally paginated with ?limit=&offset=)"""
     try:
         patient = Patient.query.get_or_404(patient_id)
-        invoices = Invoice.query.filter_by(patient_id=patient_id).order_by(Invoice.created_at.desc()).all()
+        limit = request.args.get('limit', type=int)
+        offset = request.args.get('offset', 0, type=int)
+        
+        # Read-only listing: select plain rows instead of hydrating Invoice/InvoiceItem objects
+        query = invoice_listing_query(patient_id)
+        if limit:
+            query = query.limit(limit).offset(offset)
+        invoices = db.session.execute(query).mappings().all()
         
         return jsonify({
-            'invoices': [{
-                'id': inv.id,
-                'invoice_number': inv.invoice_number,
-                'invoice_type': inv.invoice_type,
-                'status': inv.status,
-                'total_amount': inv.total_amount,
-                'amount_paid': inv.amount_paid,
-                'currency': inv.currency,
-                'invoice_date': inv.invoice_date.isoformat() if inv.invoice_date else None,
-                'due_date': inv.due_date.isoformat() if inv.due_date else None,
-                'paid_date': inv.paid_date.isoformat() if inv.paid_date else None,
-                'description': inv.description,
-                'is_recurring': inv.is_recurring,
-                'recurring_frequency': inv.recurring_frequency,
-                'next_billing_date': inv.next_billing_date.isoformat() if inv.next_billing_date else None,
-                'stripe_hosted_invoice_url': inv.stripe_hosted_invoice_url,
-                'stripe_invoice_pdf': inv.stripe_invoice_pdf,
-                'items': [{
-                    'description': item.description,
-                    'quantity': item.quantity,
-                    'unit_price': item.unit_price,
-                    'tax_rate': item.tax_rate,
-                    'amount': item.amount
-                } for item in inv.items]
-            } for inv in invoices]
+            'invoices': load_invoice_items(invoices),
+            'limit': limit,
+            'offset': offset
         })
     except Exception as e:
         logger.error(f"Error fetching patient invoices: {e}", exc_info=True)
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         try:
@@ -1784,6 +1861,23 @@ def get_patient_invoices(patient_id):
         except:
             pass
 
+@app.route('/patients/<int:patient_id>/invoices/export', methods=['GET'])
+@optional_login_required
+def export_patient_invoices(patient_id):
+    """Stream all invoices for a patient as newline-delimited JSON, one invoice per line"""
+    Patient.query.get_or_404(patient_id)
+    
+    def generate():
+        # yield_per keeps only one batch of rows (and their items) in memory at a time
+        result = db.session.execute(
+            invoice_listing_query(patient_id).execution_options(yield_per=200)
+        ).mappings()
+        for batch in result.partitions():
+            for invoice in load_invoice_items(batch):
+                yield orjson.dumps(invoice) + b'\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/patients/<int:patient_id>/invoices', methods=['POST'])
 @optional_login_required
 def create_patient_invoice(patient_id):
@@ -1890,7 +1984,7 @@ def import_from_cliniko():
                 skipped_count += 1
                 continue
             
-            existing = Patient.query.filter_by(email=email).first()
+            existing = Patient.query.filter(db.func.lower(Patient.email) == email.strip().lower()).first()
             if existing:
                 if not existing.cliniko_patient_id:
                     existing.cliniko_patient_id = str(cp.get('id'))
@@ -1926,47 +2020,81 @@ def import_from_cliniko():
     
     return redirect(url_for('patients.patients_list'))
 
+# Directories already created by this worker, so repeat uploads skip the makedirs syscall
+_ENSURED_DIRS = set()
+
+def ensure_dir(path):
+    """Create a directory once per process (no-op on subsequent calls)"""
+    if path not in _ENSURED_DIRS:
+        os.makedirs(path, exist_ok=True)
+        _ENSURED_DIRS.add(path)
+
+def first_line(text):
+    """Return the stripped first line of text without splitting the whole string"""
+    newline = text.find('\n')
+    return (text if newline < 0 else text[:newline]).strip()
+
 # Patient Notes API Endpoints
 @app.route('/api/patients/<int:patient_id>/notes', methods=['GET'])
 @optional_login_required
 def get_patient_notes(patient_id):
     """Get all notes for a patient"""
     try:
-        notes = PatientNote.query.filter_by(patient_id=patient_id).order_by(PatientNote.created_at.desc()).all()
+        # Read-only listing: select plain rows (with the linked appointment joined in)
+        # instead of hydrating PatientNote objects and fetching each appointment separately
+        notes = db.session.execute(
+            db.select(
+                PatientNote.id,
+                PatientNote.subject,
+                PatientNote.note_text,
+                PatientNote.note_type,
+                PatientNote.author,
+                PatientNote.created_at,
+                PatientNote.updated_at,
+                PatientNote.appointment_id,
+                PatientNote.attachment_filename,
+                PatientNote.attachment_path,
+                PatientNote.attachment_type,
+                PatientNote.attachment_size,
+                Appointment.id.label('linked_appointment_id'),
+                Appointment.title.label('appointment_title'),
+                Appointment.start_time.label('appointment_start_time'),
+                Appointment.appointment_type.label('appointment_type')
+            ).outerjoin(Appointment, PatientNote.appointment_id == Appointment.id)
+            .where(PatientNote.patient_id == patient_id)
+            .order_by(PatientNote.created_at.desc())
+        ).mappings().all()
         
         notes_data = []
         for note in notes:
             note_dict = {
-                'id': note.id,
-                'subject': note.subject or (note.note_text.split('\n')[0][:200] if note.note_text else ''),
-                'note_text': note.note_text,
-                'note_type': note.note_type,
-                'author': note.author or 'System',
-                'created_at': note.created_at.isoformat(),
-                'updated_at': note.updated_at.isoformat(),
-                'appointment_id': note.appointment_id,
-                'attachment_filename': note.attachment_filename,
-                'attachment_path': note.attachment_path,
-                'attachment_type': note.attachment_type,
-                'attachment_size': note.attachment_size
+                'id': note['id'],
+                'subject': note['subject'] or first_line(note['note_text'] or '')[:200],
+                'note_text': note['note_text'],
+                'note_type': note['note_type'],
+                'author': note['author'] or 'System',
+                'created_at': note['created_at'],
+                'updated_at': note['updated_at'],
+                'appointment_id': note['appointment_id'],
+                'attachment_filename': note['attachment_filename'],
+                'attachment_path': note['attachment_path'],
+                'attachment_type': note['attachment_type'],
+                'attachment_size': note['attachment_size']
             }
             
             # Include appointment details if linked
-            if note.appointment_id:
-                appointment = Appointment.query.get(note.appointment_id)
-                if appointment:
-                    note_dict['appointment'] = {
-                        'title': appointment.title,
-                        'start_time': appointment.start_time.isoformat(),
-                        'appointment_type': appointment.appointment_type
-                    }
+            if note['linked_appointment_id'] is not None:
+                note_dict['appointment'] = {
+                    'title': note['appointment_title'],
+                    'start_time': note['appointment_start_time'],
+                    'appointment_type': note['appointment_type']
+                }
             
             notes_data.append(note_dict)
         
         return jsonify({'success': True, 'notes': notes_data})
     except Exception as e:
         logger.error(f"Error getting patient notes: {e}", exc_info=True)
-        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/patients/<int:patient_id>/notes', methods=['POST'])
@@ -1975,7 +2103,7 @@ def create_patient_note(patient_id):
     """Create a new patient note (supports multipart/form-data for file uploads)"""
     try:
         # Check if this is a multipart request (file upload)
-        if request.content_type and 'multipart/form-data' in request.content_type:
+        if request.mimetype == 'multipart/form-data':
             # Handle file upload
             note_text = request.form.get('note_text', '')
             subject = request.form.get('subject', '')
@@ -1985,8 +2113,7 @@ def create_patient_note(patient_id):
             
             # Extract subject from first line if not provided
             if not subject and note_text:
-                first_line = note_text.split('\n')[0].strip()
-                subject = first_line[:200] if len(first_line) > 200 else first_line
+                subject = first_line(note_text)[:200]
             
             note = PatientNote(
                 patient_id=patient_id,
@@ -2007,20 +2134,30 @@ def create_patient_note(patient_id):
                     
                     # Create uploads directory if it doesn't exist
                     uploads_dir = os.path.join(app.root_path, 'static', 'uploads', 'notes')
-                    os.makedirs(uploads_dir, exist_ok=True)
+                    ensure_dir(uploads_dir)
+                    
+                    # Stream to a temp file while hashing; the SHA-256 digest names the stored
+                    # file so identical uploads share a single copy on disk
+                    hasher = hashlib.sha256()
+                    fd, tmp_path = tempfile.mkstemp(dir=uploads_dir, suffix='.part')
+                    with os.fdopen(fd, 'wb') as out:
+                        for chunk in iter(lambda: file.stream.read(1 << 16), b''):
+                            hasher.update(chunk)
+                            out.write(chunk)
                     
-                    # Generate unique filename
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    unique_filename = f"{patient_id}_{timestamp}_{filename}"
+                    unique_filename = f"{hasher.hexdigest()}{os.path.splitext(filename)[1].lower()}"
                     file_path = os.path.join(uploads_dir, unique_filename)
                     
-                    # Save file
-                    file.save(file_path)
+                    if os.path.exists(file_path):
+                        os.remove(tmp_path)
+                        logger.info(f"Duplicate attachment {filename} - reusing {unique_filename}")
+                    else:
+                        os.replace(tmp_path, file_path)
                     
                     # Store relative path and metadata
                     note.attachment_filename = filename
                     note.attachment_path = f"uploads/notes/{unique_filename}"
-                    note.attachment_type = file.content_type or 'application/octet-stream'
+                    note.attachment_type = (file.content_type or 'application/octet-stream').lower()
                     note.attachment_size = os.path.getsize(file_path)
                     
                     logger.info(f"File uploaded: {filename} ({note.attachment_size} bytes)")
@@ -2036,8 +2173,8 @@ def create_patient_note(patient_id):
                     'note_text': note.note_text,
                     'note_type': note.note_type,
                     'author': note.author,
-                    'created_at': note.created_at.isoformat(),
-                    'updated_at': note.updated_at.isoformat(),
+                    'created_at': note.created_at,
+                    'updated_at': note.updated_at,
                     'appointment_id': note.appointment_id,
                     'attachment_filename': note.attachment_filename,
                     'attachment_path': note.attachment_path,
@@ -2054,8 +2191,7 @@ def create_patient_note(patient_id):
             subject = data.get('subject', '')
             if not subject and note_text:
                 # Use first line as subject (max 200 chars)
-                first_line = note_text.split('\n')[0].strip()
-                subject = first_line[:200] if len(first_line) > 200 else first_line
+                subject = first_line(note_text)[:200]
             
             note = PatientNote(
                 patient_id=patient_id,
@@ -2077,8 +2213,8 @@ def create_patient_note(patient_id):
                     'note_text': note.note_text,
                     'note_type': note.note_type,
                     'author': note.author,
-                    'created_at': note.created_at.isoformat(),
-                    'updated_at': note.updated_at.isoformat(),
+                    'created_at': note.created_at,
+                    'updated_at': note.updated_at,
                     'appointment_id': note.appointment_id
                 }
             })
@@ -2111,8 +2247,8 @@ def update_patient_note(note_id):
                 'note_text': note.note_text,
                 'note_type': note.note_type,
                 'author': note.author,
-                'created_at': note.created_at.isoformat(),
-                'updated_at': note.updated_at.isoformat()
+                'created_at': note.created_at,
+                'updated_at': note.updated_at
             }
         })
     except Exception as e:
@@ -2127,8 +2263,12 @@ def delete_patient_note(note_id):
     try:
         note = PatientNote.query.get_or_404(note_id)
         
-        # Delete attached file if it exists
-        if note.attachment_path:
+        # Delete attached file if it exists and no other note shares it (attachments are stored by content hash)
+        shared = note.attachment_path and PatientNote.query.filter(
+            PatientNote.attachment_path == note.attachment_path,
+            PatientNote.id != note.id
+        ).first() is not None
+        if note.attachment_path and not shared:
             try:
                 file_path = os.path.join(app.root_path, 'static', note.attachment_path)
                 if os.path.exists(file_path):
@@ -2147,31 +2287,50 @@ def delete_patient_note(note_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Browser cache lifetime (seconds) for inline attachment previews; stored files are named by
+# content hash, so a given path never changes content
+ATTACHMENT_CACHE_MAX_AGE = 3600
+
+# Attachment types shown inline in the browser (images, PDFs); everything else is downloaded
+INLINE_ATTACHMENT_TYPES = frozenset({'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf'})
+
 @app.route('/api/notes/<int:note_id>/attachment', methods=['GET'])
 @optional_login_required
 def download_note_attachment(note_id):
     """Download or view note attachment"""
     try:
-        note = PatientNote.query.get_or_404(note_id)
+        # Only the attachment columns are needed - skip loading note_text/subject
+        note = PatientNote.query.with_entities(
+            PatientNote.attachment_path,
+            PatientNote.attachment_filename,
+            PatientNote.attachment_type
+        ).filter_by(id=note_id).first_or_404()
         
         if not note.attachment_path or not note.attachment_filename:
             return jsonify({'success': False, 'error': 'No attachment found'}), 404
         
         file_path = os.path.join(app.root_path, 'static', note.attachment_path)
+        as_attachment = note.attachment_type not in INLINE_ATTACHMENT_TYPES
         
-        if not os.path.exists(file_path):
+        # send_file hands the open file to the server's wsgi.file_wrapper, so gunicorn serves the
+        # body with sendfile(2); conditional requests are answered with 304 without resending it.
+        # Its single os.stat() (size, mtime, ETag) doubles as the existence check
+        try:
+            response = send_file(
+                file_path,
+                mimetype=note.attachment_type or 'application/octet-stream',
+                as_attachment=as_attachment,
+                download_name=note.attachment_filename,
+                conditional=True,
+                max_age=None if as_attachment else ATTACHMENT_CACHE_MAX_AGE
+            )
+        except FileNotFoundError:
             return jsonify({'success': False, 'error': 'Attachment file not found'}), 404
-        
-        # Determine if we should display inline (images, PDFs) or force download
-        inline_types = ['image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf']
-        as_attachment = note.attachment_type not in inline_types
-        
-        return send_file(
-            file_path,
-            mimetype=note.attachment_type or 'application/octet-stream',
-            as_attachment=as_attachment,
-            download_name=note.attachment_filename
-        )
+        if not as_attachment:
+            # Patient files: allow the browser to cache inline previews, but never shared caches
+            response.cache_control.public = False
+            response.cache_control.private = True
+        return response
     except Exception as e:
         logger.error(f"Error downloading attachment: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -2181,18 +2340,29 @@ def download_note_attachment(note_id):
 def update_notes_with_subjects():
     """Update all existing notes to extract subjects from first line"""
     try:
-        notes = PatientNote.query.filter(
-            (PatientNote.subject == None) | (PatientNote.subject == '')
-        ).all()
-        
-        updated_count = 0
-        for note in notes:
-            if note.note_text:
-                # Extract first line as subject (max 200 chars)
-                first_line = note.note_text.split('\n')[0].strip()
-                if first_line:
-                    note.subject = first_line[:200] if len(first_line) > 200 else first_line
-                    updated_count += 1
+        # Extract the trimmed first line (max 200 chars) in SQL and update every note in one statement
+        whitespace = ' \t\r'
+        if db.engine.dialect.name == 'postgresql':
+            note_first_line = db.func.btrim(db.func.split_part(PatientNote.note_text, '\n', 1), whitespace)
+        else:
+            newline_pos = db.func.instr(PatientNote.note_text, '\n')
+            note_first_line = db.func.trim(db.case(
+                (newline_pos > 0, db.func.substr(PatientNote.note_text, 1, newline_pos - 1)),
+                else_=PatientNote.note_text
+            ), whitespace)
+        new_subject = db.func.substr(note_first_line, 1, 200)
+        
+        result = db.session.execute(
+            db.update(PatientNote)
+            .where(
+                (PatientNote.subject == None) | (PatientNote.subject == ''),
+                PatientNote.note_text != None,
+                note_first_line != ''
+            )
+            .values(subject=new_subject)
+            .execution_options(synchronize_session=False)
+        )
+        updated_count = result.rowcount
         
         db.session.commit()
         
@@ -2208,53 +2378,96 @@ def update_notes_with_subjects():
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # Patient Correspondence Endpoints
+# Characters of the message body included in list responses (the UI previews 60 and adds an ellipsis)
+CORRESPONDENCE_PREVIEW_LENGTH = 61
+
 @app.route('/api/patients/<int:patient_id>/correspondence', methods=['GET'])
 @optional_login_required
 def get_patient_correspondence(patient_id):
     """Get all correspondence for a patient"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        
-        # Get all correspondence for this patient, ordered by most recent first
-        correspondence = PatientCorrespondence.query.filter_by(
-            patient_id=patient_id,
-            is_deleted=False
-        ).order_by(PatientCorrespondence.sent_at.desc()).all()
-        
-        return jsonify({
-            'success': True,
-            'correspondence': [{
-                'id': c.id,
-                'channel': c.channel,
-                'direction': c.direction,
-                'subject': c.subject,
-                'body': c.body,
-                'recipient_email': c.recipient_email,
-                'recipient_phone': c.recipient_phone,
-                'sender_email': c.sender_email,
-                'sender_phone': c.sender_phone,
-                'status': c.status,
-                'external_id': c.external_id,
-                'error_message': c.error_message,
-                'call_duration': c.call_duration,
-                'recording_url': c.recording_url,
-                'call_sid': c.call_sid,
-                'transcription_status': c.transcription_status,
-                'sent_at': c.sent_at.isoformat() if c.sent_at else None,
-                'delivered_at': c.delivered_at.isoformat() if c.delivered_at else None
-            } for c in correspondence]
-        })
+        assert_patient_exists(patient_id)
+        
+        # Get all correspondence for this patient, ordered by most recent first. Plain column rows
+        # skip ORM instance hydration; body_preview is the short text the patient page lists
+        rows = db.session.execute(db.select(
+            PatientCorrespondence.id,
+            PatientCorrespondence.channel,
+            PatientCorrespondence.direction,
+            PatientCorrespondence.subject,
+            PatientCorrespondence.body,
+            db.func.substr(PatientCorrespondence.body, 1, CORRESPONDENCE_PREVIEW_LENGTH).label('body_preview'),
+            PatientCorrespondence.recipient_email,
+            PatientCorrespondence.recipient_phone,
+            PatientCorrespondence.sender_email,
+            PatientCorrespondence.sender_phone,
+            PatientCorrespondence.status,
+            PatientCorrespondence.external_id,
+            PatientCorrespondence.error_message,
+            PatientCorrespondence.call_duration,
+            PatientCorrespondence.recording_url,
+            PatientCorrespondence.call_sid,
+            PatientCorrespondence.transcription_status,
+            PatientCorrespondence.sent_at,
+            PatientCorrespondence.delivered_at
+        ).where(
+            PatientCorrespondence.patient_id == patient_id,
+            PatientCorrespondence.is_deleted == False
+        ).order_by(PatientCorrespondence.sent_at.desc())).mappings().all()
+        
+        return jsonify({'success': True, 'correspondence': [dict(row) for row in rows]})
     except Exception as e:
         logger.error(f"Error fetching correspondence: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/correspondence/<int:correspondence_id>', methods=['GET'])
+@optional_login_required
+def get_correspondence_detail(correspondence_id):
+    """Get a single correspondence record including the full body"""
+    # Only plain columns are serialized; raiseload makes any future relationship access fail loudly
+    # instead of quietly adding a lazy-load query
+    c = PatientCorrespondence.query.options(raiseload('*')).filter_by(
+        id=correspondence_id, is_deleted=False
+    ).first_or_404()
+    
+    return jsonify({
+        'success': True,
+        'correspondence': {
+            'id': c.id,
+            'patient_id': c.patient_id,
+            'channel': c.channel,
+            'direction': c.direction,
+            'subject': c.subject,
+            'body': c.body,
+            'recipient_email': c.recipient_email,
+            'recipient_phone': c.recipient_phone,
+            'sender_email': c.sender_email,
+            'sender_phone': c.sender_phone,
+            'status': c.status,
+            'external_id': c.external_id,
+            'error_message': c.error_message,
+            'call_duration': c.call_duration,
+            'recording_url': c.recording_url,
+            'call_sid': c.call_sid,
+            'transcription_status': c.transcription_status,
+            'sent_at': c.sent_at,
+            'delivered_at': c.delivered_at
+        }
+    })
+
+def assert_patient_exists(patient_id):
+    """404 unless the patient exists - a primary-key EXISTS check for routes that don't need the row"""
+    if not db.session.query(db.exists().where(Patient.id == patient_id)).scalar():
+        abort(404)
+
 @app.route('/api/patients/<int:patient_id>/send-sms', methods=['POST'])
 @optional_login_required
+@small_json_body
 def send_patient_sms(patient_id):
     """Send SMS to patient via Twilio"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        data = request.json
+        assert_patient_exists(patient_id)
+        data = request.get_json(silent=True, cache=False) or {}
         
         phone = data.get('phone')
         message = data.get('message')
@@ -2263,8 +2476,7 @@ def send_patient_sms(patient_id):
             return jsonify({'success': False, 'error': 'Phone and message are required'}), 400
         
         # Send SMS using notification service
-        from .notification_service import NotificationService
-        notif_service = NotificationService()
+        notif_service = get_notification_service()
         
         # Pass patient_id and user_id so NotificationService can log correspondence
         # Set log_correspondence=True to let NotificationService handle logging
@@ -2298,8 +2510,7 @@ def send_patient_sms(patient_id):
 def generate_invite_password(patient_id):
     """Generate a temporary password for iOS app invite preview"""
     try:
-        import secrets
-        patient = Patient.query.get_or_404(patient_id)
+        patient = Patient.query.with_entities(Patient.email).filter_by(id=patient_id).first_or_404()
         
         if not patient.email:
             return jsonify({'success': False, 'error': 'Patient must have an email address'}), 400
@@ -2315,21 +2526,184 @@ def generate_invite_password(patient_id):
         logger.error(f"Error generating password: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+IOS_APP_STORE_URL = "https://apps.apple.com/app/capturecare"  # Update with actual App Store URL when published
+
+# Plain HTML used when emails/ios_app_invite.html fails to render; built once at import
+IOS_INVITE_FALLBACK_HTML = string.Template("""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }
+        .email-container { background-color: #ffffff; border-radius: 8px; padding: 40px; }
+        .header { text-align: center; margin-bottom: 30px; }
+        .logo { font-size: 24px; font-weight: bold; color: #00698f; }
+        h1 { color: #00698f; font-size: 28px; text-align: center; }
+        .credentials-box { background-color: #f8f9fa; border-left: 4px solid #00698f; padding: 20px; margin: 25px 0; }
+        .download-button {
+            display: inline-block;
+            background-color: #00698f;
+            color: #ffffff !important;
+            padding: 16px 32px;
+            text-decoration: none;
+            border-radius: 6px;
+            font-size: 18px;
+            font-weight: bold;
+            margin: 20px 0;
+        }
+    </style>
+</head>
+<body>
+    <div class="email-container">
+        <div class="header">
+            <div class="logo">CaptureCare®</div>
+            <p>Humanising Digital Health</p>
+        </div>
+        <h1>Welcome to CaptureCare Patient App</h1>
+        <p>Hello $first_name,</p>
+        <p>You've been invited to use the CaptureCare patient app!</p>
+        <div class="credentials-box">
+            <p><strong>Email:</strong> $email</p>
+            <p><strong>Password:</strong> $temp_password</p>
+        </div>
+        <div style="text-align: center;">
+            <a href="$app_store_url" class="download-button" style="color: #ffffff; text-decoration: none;">📱 DOWNLOAD THE APP</a>
+        </div>
+        <p style="font-size: 14px; color: #666;">Please change your password after signing in.</p>
+    </div>
+</body>
+</html>
+""")
+
+# Invites are sent in the request so a worker restart can't drop them; a failed send gets
+# INVITE_SEND_ATTEMPTS tries in total, INVITE_RETRY_DELAY seconds apart
+INVITE_SEND_ATTEMPTS = 2
+INVITE_RETRY_DELAY = 1.0
+
+def send_ios_invite_messages(patient_id, temp_password, channels, user_id=None):
+    """
+    Send the iOS app invite over each requested channel, retrying failed sends.
+
+    Returns a dict of channel -> error message (None if it was sent). The correspondence
+    rows for all channels are committed in one transaction, and a failed send is only
+    recorded on its last attempt (one row per channel, not one per try).
+    """
+    patient = db.session.get(Patient, patient_id)
+    notif_service = get_notification_service()
+    senders = {
+        'sms': (notif_service.twilio_configured, send_ios_invite_sms),
+        'email': (notif_service.smtp_configured, send_ios_invite_email)
+    }
+    
+    errors = {}
+    for channel in channels:
+        configured, send = senders[channel]
+        if not configured:
+            logger.warning(f"{channel} invite not sent for patient {patient_id}: service not configured")
+            errors[channel] = f'{channel.upper()} service not configured'
+            continue
+        for attempt in range(1, INVITE_SEND_ATTEMPTS + 1):
+            if send(notif_service, patient, temp_password, user_id, log_failure=attempt == INVITE_SEND_ATTEMPTS):
+                errors[channel] = None
+                break
+            if attempt < INVITE_SEND_ATTEMPTS:
+                time.sleep(INVITE_RETRY_DELAY)
+        else:
+            errors[channel] = f'{channel.upper()} service failed'
+    
+    db.session.commit()
+    return errors
+
+def send_ios_invite_sms(notif_service, patient, temp_password, user_id=None, log_failure=True):
+    """Send the iOS app invite SMS; the correspondence row is left for the caller to commit"""
+    sms_message = f"CaptureCare App Invite: Download the app and sign in with email {patient.email} and password {temp_password}. Change password after login."
+    sms_result = notif_service.send_sms(
+        patient.mobile or patient.phone,
+        sms_message,
+        patient_id=patient.id,
+        user_id=user_id,
+        log_correspondence=True,
+        defer_commit=True,
+        log_failure=log_failure
+    )
+    if not sms_result.get('success', False):
+        logger.warning(f"SMS invite failed for patient {patient.id}: {sms_result.get('error')}")
+        return False
+    logger.info(f"✅ iOS app invite SMS sent to patient {patient.id}")
+    return True
+
+def send_ios_invite_email(notif_service, patient, temp_password, user_id=None, log_failure=True):
+    """Send the iOS app invite email; the correspondence row is left for the caller to commit"""
+    app_store_url = IOS_APP_STORE_URL
+    
+    # Plain text fallback for the email
+    message = f"""Hi {patient.first_name}, 
+
+You've been invited to use the CaptureCare patient app! 
+
+Download the app and sign in with:
+Email: {patient.email}
+Password: {temp_password}
+
+You can change your password after signing in.
+
+Download: {app_store_url}
+
+- CaptureCare Team"""
+    
+    # Render branded HTML template
+    try:
+        body_html = render_template('emails/ios_app_invite.html', 
+                                  patient=patient, 
+                                  temp_password=temp_password,
+                                  app_store_url=app_store_url,
+                                  current_year=datetime.now().year)
+    except Exception as template_error:
+        logger.error(f"Error rendering iOS app invite template: {template_error}", exc_info=True)
+        # Fallback to simple HTML
+        body_html = IOS_INVITE_FALLBACK_HTML.substitute(
+            first_name=patient.first_name,
+            email=patient.email,
+            temp_password=temp_password,
+            app_store_url=app_store_url
+        )
+    
+    email_sent = notif_service.send_email(
+        to_email=patient.email,
+        subject="Welcome to CaptureCare Patient App",
+        body_html=body_html,
+        body_text=message,
+        patient_id=patient.id,
+        user_id=user_id,
+        log_correspondence=True,
+        defer_commit=True,
+        log_failure=log_failure
+    )
+    if not email_sent:
+        logger.warning(f"Email invite failed for patient {patient.id}")
+        return False
+    logger.info(f"✅ iOS app invite email sent to patient {patient.id}")
+    return True
+
 @app.route('/api/patients/<int:patient_id>/send-ios-invite', methods=['POST'])
 @optional_login_required
+@small_json_body
 def send_ios_app_invite(patient_id):
     """Send iOS app invite to patient - creates account and sends SMS/email"""
     try:
-        from werkzeug.security import generate_password_hash
-        import secrets
-        
-        patient = Patient.query.get_or_404(patient_id)
+        # Only the contact columns are needed to create the login and queue the invite
+        patient = Patient.query.with_entities(
+            Patient.email,
+            Patient.mobile,
+            Patient.phone
+        ).filter_by(id=patient_id).first_or_404()
         
         if not patient.email:
             return jsonify({'success': False, 'error': 'Patient must have an email address to receive invite'}), 400
         
         # Get request data
-        data = request.json or {}
+        data = request.get_json(silent=True, cache=False) or {}
         send_methods = data.get('send_methods', ['email', 'sms'])  # Default to both
         temp_password = data.get('temp_password')
         
@@ -2337,63 +2711,36 @@ def send_ios_app_invite(patient_id):
         if not temp_password:
             temp_password = secrets.token_urlsafe(12)  # 16 character random password
         
-        # Ensure PatientAuth table exists (create if it doesn't)
-        try:
-            # Try to create all tables (idempotent - won't recreate existing ones)
-            db.create_all()
-            logger.info("✅ Database tables verified/created")
-        except Exception as e:
-            logger.warning(f"Could not ensure PatientAuth table exists: {e}")
+        # Hash once - scrypt/pbkdf2 is the expensive part of this request
+        password_hash = generate_password_hash(temp_password)
         
-        # Check if PatientAuth already exists
-        patient_auth = None
-        try:
-            patient_auth = PatientAuth.query.filter_by(patient_id=patient_id).first()
-        except Exception as e:
-            # Table might not exist - try to create it
-            error_str = str(e).lower()
-            if 'does not exist' in error_str or 'no such table' in error_str or 'relation' in error_str:
-                logger.error(f"PatientAuth table does not exist: {e}")
-                logger.info("Attempting to create PatientAuth table...")
-                try:
-                    # Try creating just the PatientAuth table
-                    PatientAuth.__table__.create(db.engine, checkfirst=True)
-                    logger.info("✅ PatientAuth table created")
-                    patient_auth = None  # Will create new one below
-                except Exception as create_error:
-                    logger.error(f"Failed to create PatientAuth table: {create_error}")
-                    return jsonify({
-                        'success': False,
-                        'error': 'Database table "patient_auth" does not exist. Please run this SQL on your database:\n\nCREATE TABLE patient_auth (id SERIAL PRIMARY KEY, patient_id INTEGER NOT NULL UNIQUE REFERENCES patients(id), auth_provider VARCHAR(20) NOT NULL, provider_user_id VARCHAR(200), email VARCHAR(120), password_hash VARCHAR(200), refresh_token VARCHAR(500), token_expires_at TIMESTAMP, is_active BOOLEAN DEFAULT TRUE, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);'
-                    }), 500
-            else:
-                # Some other database error
-                logger.error(f"Database error querying PatientAuth: {e}")
-                return jsonify({
-                    'success': False,
-                    'error': f'Database error: {str(e)}'
-                }), 500
-        
-        if patient_auth:
-            # Update existing auth with new password
-            patient_auth.set_password(temp_password)
-            patient_auth.is_active = True
-            patient_auth.auth_provider = 'email'
-            patient_auth.email = patient.email
-        else:
-            # Create new PatientAuth
-            patient_auth = PatientAuth(
-                patient_id=patient_id,
-                auth_provider='email',
-                email=patient.email,
-                is_active=True
-            )
-            patient_auth.set_password(temp_password)
-            db.session.add(patient_auth)
+        # Create or reset the email login in one round trip: INSERT ... ON CONFLICT (patient_id) DO UPDATE
+        auth_insert = postgresql_insert if db.engine.dialect.name == 'postgresql' else sqlite_insert
+        now = datetime.utcnow()
+        upsert = auth_insert(PatientAuth).values(
+            patient_id=patient_id,
+            auth_provider='email',
+            email=patient.email,
+            password_hash=password_hash,
+            is_active=True,
+            created_at=now,
+            updated_at=now
+        )
+        upsert = upsert.on_conflict_do_update(
+            index_elements=[PatientAuth.patient_id],
+            set_={
+                'auth_provider': upsert.excluded.auth_provider,
+                'email': upsert.excluded.email,
+                'password_hash': upsert.excluded.password_hash,
+                'is_active': True,
+                'updated_at': now
+            }
+        )
         
         try:
+            db.session.execute(upsert)
             db.session.commit()
-            logger.info(f"✅ PatientAuth record {'updated' if patient_auth else 'created'} for patient {patient_id}")
+            logger.info(f"✅ PatientAuth record saved for patient {patient_id}")
         except Exception as e:
             logger.error(f"Database commit failed: {e}", exc_info=True)
             db.session.rollback()
@@ -2409,165 +2756,38 @@ def send_ios_app_invite(patient_id):
                     'error': f'Database error: {str(e)}'
                 }), 500
         
-        # Prepare invite message
-        app_store_url = "https://apps.apple.com/app/capturecare"  # Update with actual App Store URL when published
-        
-        # Plain text message for SMS
-        message = f"""Hi {patient.first_name}, 
-
-You've been invited to use the CaptureCare patient app! 
-
-Download the app and sign in with:
-Email: {patient.email}
-Password: {temp_password}
-
-You can change your password after signing in.
-
-Download: {app_store_url}
-
-- CaptureCare Team"""
-        
-        # Send SMS if requested and phone number available
-        sms_sent = False
-        sms_error = None
+        user_id = current_user.id if current_user.is_authenticated else None
+        channels = []
         if 'sms' in send_methods and (patient.mobile or patient.phone):
-            try:
-                from .notification_service import NotificationService
-                notif_service = NotificationService()
-                phone = patient.mobile or patient.phone
-                sms_message = f"CaptureCare App Invite: Download the app and sign in with email {patient.email} and password {temp_password}. Change password after login."
-                sms_result = notif_service.send_sms(
-                    phone,
-                    sms_message,
-                    patient_id=patient_id,
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    log_correspondence=True
-                )
-                sms_sent = sms_result.get('success', False)
-                if not sms_sent:
-                    sms_error = sms_result.get('error', 'SMS service not configured or failed')
-                    logger.warning(f"SMS invite failed for patient {patient_id}: {sms_error}")
-            except Exception as e:
-                sms_error = str(e)
-                logger.error(f"Could not send SMS invite: {e}", exc_info=True)
-        
-        # Send email if requested
-        email_sent = False
-        email_error = None
+            channels.append('sms')
         if 'email' in send_methods:
-            try:
-                # Use NotificationService which handles email sending properly
-                from .notification_service import NotificationService
-                notif_service = NotificationService()
-                
-                # Render branded HTML template
-                from datetime import datetime
-                try:
-                    body_html = render_template('emails/ios_app_invite.html', 
-                                              patient=patient, 
-                                              temp_password=temp_password,
-                                              app_store_url=app_store_url,
-                                              current_year=datetime.now().year)
-                    logger.info(f"✅ iOS app invite email template rendered successfully")
-                except Exception as template_error:
-                    logger.error(f"Error rendering iOS app invite template: {template_error}", exc_info=True)
-                    # Fallback to simple HTML
-                    body_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .email-container {{ background-color: #ffffff; border-radius: 8px; padding: 40px; }}
-        .header {{ text-align: center; margin-bottom: 30px; }}
-        .logo {{ font-size: 24px; font-weight: bold; color: #00698f; }}
-        h1 {{ color: #00698f; font-size: 28px; text-align: center; }}
-        .credentials-box {{ background-color: #f8f9fa; border-left: 4px solid #00698f; padding: 20px; margin: 25px 0; }}
-        .download-button {{
-            display: inline-block;
-            background-color: #00698f;
-            color: #ffffff !important;
-            padding: 16px 32px;
-            text-decoration: none;
-            border-radius: 6px;
-            font-size: 18px;
-            font-weight: bold;
-            margin: 20px 0;
-        }}
-    </style>
-</head>
-<body>
-    <div class="email-container">
-        <div class="header">
-            <div class="logo">CaptureCare®</div>
-            <p>Humanising Digital Health</p>
-        </div>
-        <h1>Welcome to CaptureCare Patient App</h1>
-        <p>Hello {patient.first_name},</p>
-        <p>You've been invited to use the CaptureCare patient app!</p>
-        <div class="credentials-box">
-            <p><strong>Email:</strong> {patient.email}</p>
-            <p><strong>Password:</strong> {temp_password}</p>
-        </div>
-        <div style="text-align: center;">
-            <a href="{app_store_url}" class="download-button" style="color: #ffffff; text-decoration: none;">📱 DOWNLOAD THE APP</a>
-        </div>
-        <p style="font-size: 14px; color: #666;">Please change your password after signing in.</p>
-    </div>
-</body>
-</html>
-"""
-                
-                email_sent = notif_service.send_email(
-                    to_email=patient.email,
-                    subject="Welcome to CaptureCare Patient App",
-                    body_html=body_html,
-                    body_text=message,
-                    patient_id=patient_id,
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    log_correspondence=True
-                )
-                
-                if not email_sent:
-                    email_error = "Email service not configured or failed"
-                    logger.warning(f"Email invite failed for patient {patient_id}: {email_error}")
-            except Exception as e:
-                email_error = str(e)
-                logger.error(f"Could not send email invite: {e}", exc_info=True)
-        
-        if sms_sent or email_sent:
-            # At least one method succeeded - account is created, return success
-            error_details = []
-            if 'email' in send_methods and not email_sent:
-                error_details.append(f"Email failed: {email_error or 'Email service not configured'}")
-            if 'sms' in send_methods and not sms_sent:
-                error_details.append(f"SMS failed: {sms_error or 'SMS service not configured'}")
-            
-            return jsonify({
-                'success': True,
-                'message': 'Invite sent successfully',
-                'email_sent': email_sent,
-                'sms_sent': sms_sent,
-                'temp_password': temp_password,  # Include for display purposes
-                'warnings': error_details if error_details else None
-            })
-        else:
-            # Both methods failed - provide detailed error
+            channels.append('email')
+        
+        errors = send_ios_invite_messages(patient_id, temp_password, channels, user_id)
+        sms_sent = 'sms' in errors and errors['sms'] is None
+        email_sent = 'email' in errors and errors['email'] is None
+        
+        if not (sms_sent or email_sent):
             error_msg = 'Could not send invite via SMS or email.'
-            if 'email' in send_methods and email_error:
-                error_msg += f' Email: {email_error}.'
-            if 'sms' in send_methods and sms_error:
-                error_msg += f' SMS: {sms_error}.'
-            if not error_msg.endswith('.'):
-                error_msg += ' Please check patient contact information and service configuration.'
-            
+            for error in errors.values():
+                error_msg += f' {error}.'
+            error_msg += ' Please check patient contact information and service configuration.'
             return jsonify({
                 'success': False,
                 'error': error_msg,
-                'email_error': email_error,
-                'sms_error': sms_error
+                'email_error': errors.get('email'),
+                'sms_error': errors.get('sms')
             }), 400
+        
+        warnings = [error for error in errors.values() if error]
+        return jsonify({
+            'success': True,
+            'message': 'Invite sent successfully',
+            'email_sent': email_sent,
+            'sms_sent': sms_sent,
+            'temp_password': temp_password,  # Include for display purposes
+            'warnings': warnings or None
+        })
             
     except Exception as e:
         logger.error(f"Error sending iOS app invite: {e}")
@@ -2576,11 +2796,12 @@ Download: {app_store_url}
 
 @app.route('/api/patients/<int:patient_id>/initiate-call', methods=['POST'])
 @optional_login_required
+@small_json_body
 def initiate_patient_call(patient_id):
     """Initiate outbound call to patient via Twilio"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        data = request.json
+        assert_patient_exists(patient_id)
+        data = request.get_json(silent=True, cache=False) or {}
         
         phone = data.get('phone')
         
@@ -2588,8 +2809,7 @@ def initiate_patient_call(patient_id):
             return jsonify({'success': False, 'error': 'Phone number is required'}), 400
         
         # Initiate call using notification service
-        from .notification_service import NotificationService
-        notif_service = NotificationService()
+        notif_service = get_notification_service()
         
         result = notif_service.initiate_call(
             to_phone=phone,
@@ -2616,11 +2836,12 @@ def initiate_patient_call(patient_id):
 
 @app.route('/api/patients/<int:patient_id>/end-call', methods=['POST'])
 @optional_login_required
+@small_json_body
 def end_patient_call(patient_id):
     """Terminate the call in Twilio and save call notes and duration"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        data = request.json
+        assert_patient_exists(patient_id)
+        data = request.get_json(silent=True, cache=False) or {}
         
         call_sid = data.get('call_sid')
         duration = data.get('duration', 0)
@@ -2631,8 +2852,7 @@ def end_patient_call(patient_id):
         
         # First, terminate the call in Twilio
         try:
-            from .notification_service import NotificationService
-            notif_service = NotificationService()
+            notif_service = get_notification_service()
             
             if notif_service.twilio_configured:
                 # Fetch the call and update its status to 'completed' to hang it up
@@ -2640,12 +2860,12 @@ def end_patient_call(patient_id):
                 
                 # Only update if call is still active (not already completed/canceled)
                 if call.status in ['queued', 'ringing', 'in-progress', 'initiated']:
-                    logger.info(f"📞 Terminating call {call_sid} (current status: {call.status})")
+                    logger.info("📞 Terminating call %s (current status: %s)", call_sid, call.status)
                     # Update call status to 'completed' to hang up
                     call.update(status='completed')
-                    logger.info(f"✅ Call {call_sid} terminated successfully")
+                    logger.info("✅ Call %s terminated successfully", call_sid)
                 else:
-                    logger.info(f"📞 Call {call_sid} already ended (status: {call.status})")
+                    logger.info("📞 Call %s already ended (status: %s)", call_sid, call.status)
             else:
                 logger.warning(f"⚠️  Twilio not configured, cannot terminate call {call_sid}")
         except Exception as twilio_error:
@@ -2666,7 +2886,7 @@ def end_patient_call(patient_id):
             correspondence.call_duration = duration
             correspondence.status = 'completed'
             db.session.commit()
-            logger.info(f"✅ Updated call record with duration {duration}s and notes for patient {patient_id}")
+            logger.info("✅ Updated call record with duration %ss and notes for patient %s", duration, patient_id)
             
             return jsonify({
                 'success': True,
@@ -2684,31 +2904,51 @@ def end_patient_call(patient_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# How long a call status is served to pollers (seconds). The cache is per worker process, so only
+# final statuses (which can't change) are kept long; an in-progress status held by one worker may
+# already be stale, so it expires quickly and the next poll asks Twilio again
+CALL_STATUS_CACHE_TIMEOUT = 3600
+CALL_STATUS_PENDING_CACHE_TIMEOUT = 5
+CALL_FINAL_STATUSES = frozenset({'completed', 'failed', 'busy', 'no-answer', 'canceled'})
+
+def call_status_cache_key(call_sid):
+    return f'call_status:{call_sid}'
+
+def cache_call_status(call_sid, status):
+    """Remember a call status for get_call_status, for longer once the call has finished"""
+    timeout = CALL_STATUS_CACHE_TIMEOUT if status['status'] in CALL_FINAL_STATUSES else CALL_STATUS_PENDING_CACHE_TIMEOUT
+    cache.set(call_status_cache_key(call_sid), status, timeout=timeout)
+
 @app.route('/api/patients/<int:patient_id>/call-status/<call_sid>', methods=['GET'])
 @optional_login_required
 def get_call_status(patient_id, call_sid):
     """Get current status of an active call"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
+        assert_patient_exists(patient_id)
         
         # Get Twilio client
-        from .notification_service import NotificationService
-        notif_service = NotificationService()
+        notif_service = get_notification_service()
         
         if not notif_service.twilio_configured:
             return jsonify({'success': False, 'error': 'Twilio not configured'}), 400
         
+        # Status from the call-status webhook or a recent poll on this worker; ask Twilio otherwise
+        cached_status = cache.get(call_status_cache_key(call_sid))
+        if cached_status:
+            return jsonify({'success': True, **cached_status})
+        
         try:
             # Fetch call status from Twilio
             call = notif_service.twilio_client.calls(call_sid).fetch()
             
-            return jsonify({
-                'success': True,
+            status = {
                 'status': call.status,
                 'duration': call.duration if call.duration else 0,
                 'from': call.from_,
                 'to': call.to
-            })
+            }
+            cache_call_status(call_sid, status)
+            return jsonify({'success': True, **status})
         except Exception as e:
             logger.error(f"Error fetching call status: {e}")
             return jsonify({'success': False, 'error': str(e)}), 400
@@ -2716,44 +2956,37 @@ def get_call_status(patient_id, call_sid):
         logger.error(f"Error getting call status: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@lru_cache(maxsize=1)
+def warn_localhost_base_url():
+    """Log the missing BASE_URL warning once per process rather than on every video token"""
+    logger.warning("⚠️ BASE_URL not configured - patient links will use localhost and won't work for external patients!")
+    logger.warning("⚠️ Set BASE_URL environment variable to your public URL (e.g., ngrok URL or domain)")
+
+@lru_cache(maxsize=8)
+def video_access_token_factory(account_sid, signing_key_sid, secret):
+    """AccessToken constructor bound to one set of credentials, with the signing secret encoded once"""
+    return partial(AccessToken, account_sid, signing_key_sid, secret.encode('utf-8'))
+
 @app.route('/api/patients/<int:patient_id>/video-token', methods=['POST'])
 @optional_login_required
 def generate_video_token(patient_id):
     """Generate Twilio Video access token for practitioner"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
+        assert_patient_exists(patient_id)
+        
+        # Get credentials (Secret Manager in Cloud, .env locally) - cached until the .env file changes
+        account_sid, auth_token, api_key_sid, api_key_secret = get_twilio_credentials()
         
-        # Get credentials - Prioritize Secret Manager (Cloud) over .env file (local)
-        # Only reload .env file if NOT using Secret Manager (local development)
-        use_secret_manager = os.getenv('USE_SECRET_MANAGER', 'False').lower() == 'true'
-        if not use_secret_manager:
-            from dotenv import load_dotenv
-            env_file_path = os.path.join(os.path.dirname(__file__), 'capturecare.env')
-            if os.path.exists(env_file_path):
-                load_dotenv(env_file_path, override=True)
-        
-        # Get credentials from environment (most up-to-date)
-        # Priority: os.getenv (Secret Manager or .env) > app.config
-        account_sid = os.getenv('TWILIO_ACCOUNT_SID', '') or app.config.get('TWILIO_ACCOUNT_SID', '')
-        auth_token = os.getenv('TWILIO_AUTH_TOKEN', '') or app.config.get('TWILIO_AUTH_TOKEN', '')
-        api_key_sid = os.getenv('TWILIO_API_KEY_SID', '') or app.config.get('TWILIO_API_KEY_SID', '')
-        api_key_secret = os.getenv('TWILIO_API_KEY_SECRET', '') or app.config.get('TWILIO_API_KEY_SECRET', '')
-        
-        # Strip whitespace from credentials
-        account_sid = account_sid.strip() if account_sid else ''
-        auth_token = auth_token.strip() if auth_token else ''
-        api_key_sid = api_key_sid.strip() if api_key_sid else ''
-        api_key_secret = api_key_secret.strip() if api_key_secret else ''
-        
-        logger.info(f"📹 Video token request:")
-        logger.info(f"   Account SID: {'✅ ' + account_sid[:15] + '...' if account_sid else '❌ MISSING'}")
-        logger.info(f"   Auth Token: {'✅ ' + auth_token[:10] + '...' if auth_token else '❌ MISSING'}")
-        logger.info(f"   API Key SID: {'✅ ' + api_key_sid[:20] + '...' if api_key_sid else '❌ MISSING'}")
-        logger.info(f"   API Key Secret: {'✅ ' + api_key_secret[:15] + '...' if api_key_secret else '❌ MISSING'}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📹 Video token request:")
+            logger.debug("   Account SID: %s", '✅ ' + account_sid[:15] + '...' if account_sid else '❌ MISSING')
+            logger.debug("   Auth Token: %s", '✅ ' + auth_token[:10] + '...' if auth_token else '❌ MISSING')
+            logger.debug("   API Key SID: %s", '✅ ' + api_key_sid[:20] + '...' if api_key_sid else '❌ MISSING')
+            logger.debug("   API Key Secret: %s", '✅ ' + api_key_secret[:15] + '...' if api_key_secret else '❌ MISSING')
         
         # Validate API Key SID format
         if api_key_sid and not api_key_sid.startswith('SK'):
-            logger.warning(f"⚠️  API Key SID doesn't start with 'SK': {api_key_sid[:20]}...")
+            logger.warning("⚠️  API Key SID doesn't start with 'SK': %s...", api_key_sid[:20])
         
         if not account_sid:
             return jsonify({
@@ -2765,9 +2998,9 @@ def generate_video_token(patient_id):
         use_api_keys = bool(api_key_sid and api_key_secret)
         
         if use_api_keys:
-            logger.info(f"📹 Using Video API Keys (from Settings)")
+            logger.info("📹 Using Video API Keys (from Settings)")
         elif auth_token:
-            logger.info(f"📹 Using Account SID + Auth Token (SMS credentials as fallback)")
+            logger.info("📹 Using Account SID + Auth Token (SMS credentials as fallback)")
         else:
             return jsonify({
                 'success': False,
@@ -2775,11 +3008,7 @@ def generate_video_token(patient_id):
             }), 400
         
         try:
-            from twilio.jwt.access_token import AccessToken
-            from twilio.jwt.access_token.grants import VideoGrant
-            
             # Generate unique room name
-            import uuid
             room_name = f"patient_{patient_id}_{uuid.uuid4().hex[:8]}"
             
             # Create access token for practitioner
@@ -2810,18 +3039,18 @@ def generate_video_token(patient_id):
                 #   - signing_key_sid = API Key SID (SK...) - becomes 'iss' (issuer) in JWT
                 #   - secret = API Key Secret
                 #   - identity = user identity
-                logger.info(f"📹 Creating AccessToken with API Keys:")
-                logger.info(f"   Account SID (subject): {account_sid}")
-                logger.info(f"   API Key SID (issuer): {api_key_sid[:20]}...")
-                logger.info(f"   Identity: {identity}")
+                logger.info("📹 Creating AccessToken with API Keys:")
+                logger.info("   Account SID (subject): %s", account_sid)
+                logger.info("   API Key SID (issuer): %s...", api_key_sid[:20])
+                logger.info("   Identity: %s", identity)
                 
-                token = AccessToken(account_sid, api_key_sid, api_key_secret, identity=identity)
-                logger.info(f"📹 ✅ AccessToken created successfully")
+                token = video_access_token_factory(account_sid, api_key_sid, api_key_secret)(identity=identity)
+                logger.info("📹 ✅ AccessToken created successfully")
             else:
                 # Fallback: Use Account SID + Auth Token (same credentials as SMS)
                 # When using Auth Token, Account SID is used as both account_sid and signing_key_sid
-                token = AccessToken(account_sid, account_sid, auth_token, identity=identity)
-                logger.info(f"📹 Generated token using Account SID + Auth Token")
+                token = video_access_token_factory(account_sid, account_sid, auth_token)(identity=identity)
+                logger.info("📹 Generated token using Account SID + Auth Token")
             
             # Grant access to video room
             video_grant = VideoGrant(room=room_name)
@@ -2834,13 +3063,12 @@ def generate_video_token(patient_id):
             jwt_token = token.to_jwt()
             
             # Get public base URL for patient join link
-            base_url = app.config.get('BASE_URL', '') or os.getenv('BASE_URL', '') or os.getenv('PUBLIC_URL', '')
+            base_url = PUBLIC_BASE_URL
             if not base_url:
                 # Fallback: try to construct from request (but warn if localhost)
                 base_url = request.host_url.rstrip('/')
                 if '127.0.0.1' in base_url or 'localhost' in base_url:
-                    logger.warning("⚠️ BASE_URL not configured - patient links will use localhost and won't work for external patients!")
-                    logger.warning("⚠️ Set BASE_URL environment variable to your public URL (e.g., ngrok URL or domain)")
+                    warn_localhost_base_url()
             
             # Build patient join URL
             patient_join_url = f"{base_url}/video-room/{room_name}"
@@ -2848,9 +3076,9 @@ def generate_video_token(patient_id):
             # Note: We're using ad-hoc rooms (recommended by Twilio)
             # The room will be created automatically when the first participant connects
             # This is better for scaling than REST API room creation
-            logger.info(f"📹 Using ad-hoc room creation (room created on first participant join)")
-            logger.info(f"📹 Generated video token for room: {room_name}, identity: {identity}")
-            logger.info(f"📹 Patient join URL: {patient_join_url}")
+            logger.info("📹 Using ad-hoc room creation (room created on first participant join)")
+            logger.info("📹 Generated video token for room: %s, identity: %s", room_name, identity)
+            logger.info("📹 Patient join URL: %s", patient_join_url)
             
             return jsonify({
                 'success': True,
@@ -2914,11 +3142,12 @@ def generate_video_token(patient_id):
 
 @app.route('/api/patients/<int:patient_id>/log-video-call', methods=['POST'])
 @optional_login_required
+@small_json_body
 def log_video_call(patient_id):
     """Log completed video call to correspondence"""
     try:
-        patient = Patient.query.get_or_404(patient_id)
-        data = request.json
+        assert_patient_exists(patient_id)
+        data = request.get_json(silent=True, cache=False) or {}
         
         room_name = data.get('room_name')
         duration = data.get('duration', 0)
@@ -2954,6 +3183,52 @@ def log_video_call(patient_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Anything that isn't a digit (spaces, dashes, unicode, etc.) - stripped when normalizing phone numbers
+NON_DIGIT_RE = re.compile(r'\D')
+
+def normalize_phone(phone):
+    """
+    Normalize a phone number to digits in Australian local format for matching.
+    Converts +61417518940 to 0417518940; returns None for an empty number.
+    """
+    if not phone:
+        return None
+    phone = NON_DIGIT_RE.sub('', phone)
+    # Convert 61... to 0... (Australian format)
+    if phone.startswith('61') and len(phone) == 11:
+        phone = '0' + phone[2:]
+    return phone
+
+def phone_digits(column):
+    """SQL expression for a phone column with non-digits stripped (uses idx_patients_*_digits on Postgres)"""
+    if db.engine.dialect.name == 'postgresql':
+        return db.func.regexp_replace(column, '[^0-9]', '', 'g')
+    # SQLite has no regexp_replace - strip the separators phone numbers are stored with
+    for char in (' ', '-', '(', ')', '+', '.'):
+        column = db.func.replace(column, char, '')
+    return column
+
+# Twilio only needs an empty TwiML document back; encode it once instead of per webhook
+EMPTY_TWIML = b'<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+def empty_twiml_response():
+    """Empty TwiML acknowledgement for Twilio webhooks"""
+    # A fresh Response per request - after_request hooks may set headers on it
+    return Response(EMPTY_TWIML, mimetype='text/xml')
+
+# JSON SMS payloads use Twilio-style keys, with lowercase/snake_case fallbacks from other senders
+SMS_FIELD_ALIASES = {
+    'from': ('From', 'from', 'from_phone'),
+    'to': ('To', 'to', 'to_phone'),
+    'body': ('Body', 'body', 'message'),
+    'sid': ('MessageSid', 'message_sid', 'sid'),
+    'status': ('SmsStatus', 'status'),
+}
+
+def first_present(data, keys):
+    """First non-empty value among keys, stopping at the first hit"""
+    return next((data[key] for key in keys if data.get(key)), None)
+
 @app.route('/api/webhook/sms', methods=['POST'])
 def webhook_receive_sms():
     """
@@ -2963,28 +3238,33 @@ def webhook_receive_sms():
     """
     from_phone = None
     webhook_log = None
+    # Parse the form once; every field below is a plain dict lookup
+    form = request.form.to_dict()
     
     try:
-        # Log the incoming request details for debugging
-        logger.info(f"📨 SMS Webhook - Content-Type: {request.content_type}")
-        logger.info(f"📨 SMS Webhook - Form data: {dict(request.form)}")
-        logger.info(f"📨 SMS Webhook - JSON data: {request.get_json(silent=True)}")
-        logger.info(f"📨 SMS Webhook - Raw data: {request.data}")
+        # Dump the incoming request for debugging - guarded so the body is only re-read
+        # and formatted when debug logging is actually on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"📨 SMS Webhook - Content-Type: {request.content_type}, form: {form}, "
+                f"JSON: {request.get_json(silent=True)}, raw: {request.data}"
+            )
         
         # Try to get data from different possible formats
         if request.is_json:
             # JSON payload
             data = request.get_json()
-            from_phone = data.get('From') or data.get('from') or data.get('from_phone')
-            to_phone = data.get('To') or data.get('to') or data.get('to_phone')
-            message_body = data.get('Body') or data.get('body') or data.get('message')
-            message_sid = data.get('MessageSid') or data.get('message_sid') or data.get('sid')
-            message_status = data.get('SmsStatus') or data.get('status')
+            from_phone = first_present(data, SMS_FIELD_ALIASES['from'])
+            to_phone = first_present(data, SMS_FIELD_ALIASES['to'])
+            message_body = first_present(data, SMS_FIELD_ALIASES['body'])
+            message_sid = first_present(data, SMS_FIELD_ALIASES['sid'])
+            message_status = first_present(data, SMS_FIELD_ALIASES['status'])
             raw_data = data
-        elif request.form.get('Payload'):
+        elif form.get('Payload'):
             # Make.com webhook format - data is nested in Payload JSON
-            payload_str = request.form.get('Payload')
-            payload_data = json.loads(payload_str)
+            # (a malformed Payload raises here and is logged as a failed webhook below, still
+            # answered with TwiML rather than a 500)
+            payload_data = orjson.loads(form['Payload'])
             
             # Extract SMS data from nested structure
             params = payload_data.get('webhook', {}).get('request', {}).get('parameters', {})
@@ -2996,27 +3276,19 @@ def webhook_receive_sms():
             raw_data = payload_data
         else:
             # Form data (standard Twilio format)
-            from_phone = request.form.get('From')
-            to_phone = request.form.get('To')
-            message_body = request.form.get('Body')
-            message_sid = request.form.get('MessageSid')
-            message_status = request.form.get('SmsStatus')
-            raw_data = dict(request.form)
-        
-        logger.info(f"📨 Received SMS webhook from {from_phone}: {message_body}")
-        
-        # Normalize phone number for Australian format
-        # Converts +61417518940 to 0417518940 for database matching
-        def normalize_phone(phone):
-            if not phone:
-                return None
-            # Strip ALL non-numeric characters (spaces, dashes, unicode, etc.)
-            import re
-            phone = re.sub(r'\D', '', phone)  # Keep only digits
-            # Convert 61... to 0... (Australian format)
-            if phone.startswith('61') and len(phone) == 11:
-                phone = '0' + phone[2:]
-            return phone
+            from_phone = form.get('From')
+            to_phone = form.get('To')
+            message_body = form.get('Body')
+            message_sid = form.get('MessageSid')
+            message_status = form.get('SmsStatus')
+            raw_data = form
+        
+        logger.info("📨 Received SMS webhook from %s: %s", from_phone, message_body)
+        
+        # Nothing to match or log without a sender - acknowledge probes/malformed posts untouched
+        if not from_phone:
+            logger.warning("⚠️  SMS webhook without a From number, ignoring")
+            return empty_twiml_response()
         
         # Try to find patient by phone number
         patient = None
@@ -3025,29 +3297,31 @@ def webhook_receive_sms():
         
         if from_phone:
             normalized_from = normalize_phone(from_phone)
-            logger.info(f"🔍 Normalized phone: {from_phone} → {normalized_from}")
-            
-            # Get all patients and check normalized phone numbers
-            all_patients = Patient.query.all()
-            logger.info(f"🔍 Checking {len(all_patients)} patients for phone match")
+            logger.debug("🔍 Normalized phone: %s → %s", from_phone, normalized_from)
             
-            for p in all_patients:
-                normalized_mobile = normalize_phone(p.mobile)
-                normalized_phone = normalize_phone(p.phone)
+            # Stored numbers match when their digits normalize to the same value: either the
+            # local form (04...) or the 61-prefixed form of the same number
+            if normalized_from:
+                candidates = {normalized_from}
+                if normalized_from.startswith('0') and len(normalized_from) == 10:
+                    candidates.add('61' + normalized_from[1:])
                 
-                logger.info(f"  Patient {p.first_name} {p.last_name}: mobile={p.mobile} → {normalized_mobile}, phone={p.phone} → {normalized_phone}")
-                
-                if normalized_from == normalized_mobile or normalized_from == normalized_phone:
-                    patient = p
-                    patient_matched = True
-                    patient_name = f"{p.first_name} {p.last_name}"
-                    logger.info(f"✅ Matched patient: {patient_name} (ID: {patient.id})")
-                    break
+                patient = Patient.query.filter(or_(
+                    phone_digits(Patient.mobile).in_(candidates),
+                    phone_digits(Patient.phone).in_(candidates)
+                )).order_by(Patient.id).first()
             
-            if not patient:
+            if patient:
+                patient_matched = True
+                patient_name = f"{patient.first_name} {patient.last_name}"
+                logger.info("✅ Matched patient: %s (ID: %s)", patient_name, patient.id)
+            else:
                 logger.warning(f"⚠️  No patient found for normalized number: {normalized_from}")
         
         if patient:
+            # One timestamp for the correspondence row and its webhook log
+            now = datetime.utcnow()
+            
             # Log the inbound SMS to correspondence
             correspondence = PatientCorrespondence(
                 patient_id=patient.id,
@@ -3059,9 +3333,8 @@ def webhook_receive_sms():
                 recipient_phone=to_phone,
                 status=message_status,
                 external_id=message_sid,
-                sent_at=datetime.utcnow()
+                sent_at=now
             )
-            db.session.add(correspondence)
             
             # Log successful webhook
             webhook_log = CommunicationWebhookLog(
@@ -3074,17 +3347,16 @@ def webhook_receive_sms():
                 patient_id=patient.id,
                 patient_name=patient_name,
                 external_id=message_sid,
-                raw_request_data=json.dumps(raw_data)
+                raw_request_data=orjson.dumps(raw_data).decode(),
+                created_at=now
             )
-            db.session.add(webhook_log)
+            # Both rows go out in the same flush and transaction as one unit of work
+            db.session.add_all([correspondence, webhook_log])
             db.session.commit()
             
-            logger.info(f"✅ Logged inbound SMS from patient {patient.id}")
+            logger.info("✅ Logged inbound SMS from patient %s", patient.id)
             # Return TwiML XML response to Twilio
-            return Response(
-                '<?xml version="1.0" encoding="UTF-8"?><Response></Response>',
-                mimetype='text/xml'
-            )
+            return empty_twiml_response()
         else:
             # Patient not found - still log the webhook attempt
             webhook_log = CommunicationWebhookLog(
@@ -3096,17 +3368,14 @@ def webhook_receive_sms():
                 patient_matched=False,
                 error_message=f"No patient found with phone number: {from_phone}",
                 external_id=message_sid,
-                raw_request_data=json.dumps(raw_data)
+                raw_request_data=orjson.dumps(raw_data).decode()
             )
             db.session.add(webhook_log)
             db.session.commit()
             
             logger.warning(f"⚠️  Received SMS from unknown number: {from_phone}")
             # Return TwiML XML response to Twilio
-            return Response(
-                '<?xml version="1.0" encoding="UTF-8"?><Response></Response>',
-                mimetype='text/xml'
-            )
+            return empty_twiml_response()
             
     except Exception as e:
         error_msg = str(e)
@@ -3117,13 +3386,13 @@ def webhook_receive_sms():
             webhook_log = CommunicationWebhookLog(
                 webhook_type='sms',
                 from_phone=from_phone,
-                to_phone=request.form.get('To') if request.form else None,
-                message_body=request.form.get('Body') if request.form else None,
+                to_phone=form.get('To'),
+                message_body=form.get('Body'),
                 success=False,
                 patient_matched=False,
                 error_message=error_msg,
-                external_id=request.form.get('MessageSid') if request.form else None,
-                raw_request_data=json.dumps(dict(request.form)) if request.form else None
+                external_id=form.get('MessageSid'),
+                raw_request_data=orjson.dumps(form).decode() if form else None
             )
             db.session.add(webhook_log)
             db.session.commit()
@@ -3131,10 +3400,23 @@ def webhook_receive_sms():
             pass  # Don't let logging errors break the webhook
         
         # Return TwiML XML response to Twilio even on error
-        return Response(
-            '<?xml version="1.0" encoding="UTF-8"?><Response></Response>',
-            mimetype='text/xml'
-        )
+        return empty_twiml_response()
+
+# Completed calls get their summary saved to notes from a single background worker, so webhook
+# bursts queue up instead of each spawning its own sleeping thread
+CALL_SUMMARY_DELAY = 10  # seconds for Twilio's partial summary to become available
+
+call_summary_runner = BackgroundTaskRunner('call-summary-fetcher')
+call_summary_runner.init_app(app)
+
+def save_call_summary(patient_id, call_sid, user_id=None):
+    """Fetch a completed call's summary and save it to patient notes (runs on call_summary_runner)"""
+    get_notification_service().save_call_summary_to_notes(
+        patient_id=patient_id,
+        call_sid=call_sid,
+        user_id=user_id
+    )
+    logger.info(f"✅ Processed call summary for {call_sid}")
 
 @app.route('/api/webhook/call-status', methods=['POST'])
 def call_status_webhook():
@@ -3143,41 +3425,39 @@ def call_status_webhook():
     Fetches call summary when call completes and saves to patient notes
     """
     try:
-        call_sid = request.form.get('CallSid')
-        call_status = request.form.get('CallStatus')
-        call_duration = request.form.get('CallDuration')
+        form = request.form.to_dict()
+        call_sid = form.get('CallSid')
+        call_status = form.get('CallStatus')
+        call_duration = form.get('CallDuration')
         
-        logger.info(f"📞 Call status update - CallSid: {call_sid}, Status: {call_status}")
+        logger.info("📞 Call status update - CallSid: %s, Status: %s", call_sid, call_status)
+        
+        if not call_sid:
+            return jsonify({'success': True}), 200
+        
+        # Publish the status for get_call_status so the UI poll doesn't have to ask Twilio
+        if call_status:
+            cache_call_status(call_sid, {
+                'status': call_status,
+                'duration': int(call_duration) if call_duration else 0,
+                'from': form.get('From'),
+                'to': form.get('To')
+            })
         
         # When call completes, fetch summary and save to notes
-        if call_status == 'completed' and call_sid:
+        if call_status == 'completed':
             # Find patient by call SID in correspondence
             correspondence = PatientCorrespondence.query.filter_by(call_sid=call_sid).first()
             
             if correspondence and correspondence.patient_id:
                 # Wait a bit for summary to be available (can take up to 30 minutes, but partial available in ~10 min)
-                import time
-                import threading
-                
-                def fetch_summary_later():
-                    """Fetch summary after a delay"""
-                    time.sleep(10)  # Wait 10 seconds for partial summary to be available
-                    
-                    try:
-                        # Fetch and save call summary
-                        from .notification_service import NotificationService
-                        notif_service = NotificationService()
-                        notif_service.save_call_summary_to_notes(
-                            patient_id=correspondence.patient_id,
-                            call_sid=call_sid,
-                            user_id=correspondence.user_id
-                        )
-                        logger.info(f"✅ Processed call summary for {call_sid}")
-                    except Exception as e:
-                        logger.error(f"❌ Error fetching call summary: {e}")
-                
-                # Run in background thread so webhook responds quickly
-                threading.Thread(target=fetch_summary_later, daemon=True).start()
+                call_summary_runner.submit_later(
+                    CALL_SUMMARY_DELAY,
+                    save_call_summary,
+                    correspondence.patient_id,
+                    call_sid,
+                    correspondence.user_id
+                )
         
         return jsonify({'success': True}), 200
         
@@ -3191,20 +3471,24 @@ def call_recording_webhook():
     Twilio webhook endpoint for call recording status updates
     """
     try:
-        call_sid = request.form.get('CallSid')
-        recording_status = request.form.get('RecordingStatus')
-        recording_url = request.form.get('RecordingUrl')
-        recording_sid = request.form.get('RecordingSid')
+        form = request.form.to_dict()
+        call_sid = form.get('CallSid')
+        recording_status = form.get('RecordingStatus')
+        recording_url = form.get('RecordingUrl')
+        recording_sid = form.get('RecordingSid')
+        
+        logger.info("📼 Recording status update - CallSid: %s, Status: %s", call_sid, recording_status)
         
-        logger.info(f"📼 Recording status update - CallSid: {call_sid}, Status: {recording_status}")
+        if not call_sid:
+            return jsonify({'success': True}), 200
         
         # Update correspondence with recording URL if available
-        if recording_url and call_sid:
+        if recording_url:
             correspondence = PatientCorrespondence.query.filter_by(call_sid=call_sid).first()
             if correspondence:
                 correspondence.recording_url = recording_url
                 db.session.commit()
-                logger.info(f"✅ Updated recording URL for call {call_sid}")
+                logger.info("✅ Updated recording URL for call %s", call_sid)
         
         return jsonify({'success': True}), 200
         
@@ -3212,6 +3496,32 @@ def call_recording_webhook():
         logger.error(f"❌ Error in call recording webhook: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+class PrekeyedRequestValidator(RequestValidator):
+    """
+    RequestValidator that keys the HMAC-SHA1 once and copies it for each request.
+    Signs exactly what Twilio's compute_signature does: the URL followed by every
+    sorted param name + value.
+    """
+
+    def __init__(self, token):
+        super().__init__(token)
+        self._mac_template = hmac.new(token.encode('utf-8'), digestmod=hashlib.sha1)
+
+    def compute_signature(self, uri, params):
+        parts = [uri]
+        if params:
+            for param_name in sorted(set(params)):
+                for value in sorted(set(self.get_values(params, param_name))):
+                    parts.append(param_name + value)
+        mac = self._mac_template.copy()
+        mac.update(''.join(parts).encode('utf-8'))
+        return base64.b64encode(mac.digest()).decode('utf-8').strip()
+
+@lru_cache(maxsize=1)
+def twilio_request_validator(auth_token):
+    """RequestValidator for the current auth token - rebuilt only when the token changes"""
+    return PrekeyedRequestValidator(auth_token)
+
 @app.route('/api/webhook/call-transcription', methods=['POST'])
 def webhook_receive_call_transcription():
     """
@@ -3223,12 +3533,13 @@ def webhook_receive_call_transcription():
     """
     call_from = None
     webhook_log = None
+    # Parse the form once; also stored as the raw request data for debugging
+    raw_data = request.form.to_dict()
     
     try:
         # Validate Twilio signature for security
         if Config.TWILIO_AUTH_TOKEN:
-            from twilio.request_validator import RequestValidator
-            validator = RequestValidator(Config.TWILIO_AUTH_TOKEN)
+            validator = twilio_request_validator(Config.TWILIO_AUTH_TOKEN)
             
             # Get the URL that Twilio hit (including query params if any)
             url = request.url
@@ -3236,30 +3547,24 @@ def webhook_receive_call_transcription():
             # Get the signature from request headers
             signature = request.headers.get('X-Twilio-Signature', '')
             
-            # Get all POST parameters
-            post_vars = request.form.to_dict()
-            
-            # Validate the request came from Twilio
-            if not validator.validate(url, post_vars, signature):
+            # Validate the request came from Twilio (the validator reads the form MultiDict directly)
+            if not validator.validate(url, request.form, signature):
                 logger.warning(f"⚠️  Invalid Twilio signature for call transcription webhook")
                 return jsonify({'success': False, 'error': 'Invalid signature'}), 403
         
         # Get data from Twilio webhook
-        call_sid = request.form.get('CallSid')
-        call_from = request.form.get('From')
-        call_to = request.form.get('To')
-        call_status = request.form.get('CallStatus')
-        call_duration = request.form.get('CallDuration')
-        recording_url = request.form.get('RecordingUrl')
-        recording_sid = request.form.get('RecordingSid')
-        transcription_text = request.form.get('TranscriptionText')
-        transcription_sid = request.form.get('TranscriptionSid')
-        transcription_status = request.form.get('TranscriptionStatus')
-        
-        # Store raw request data for debugging
-        raw_data = dict(request.form)
-        
-        logger.info(f"📞 Received call transcription webhook - CallSid: {call_sid}, From: {call_from}")
+        call_sid = raw_data.get('CallSid')
+        call_from = raw_data.get('From')
+        call_to = raw_data.get('To')
+        call_status = raw_data.get('CallStatus')
+        call_duration = raw_data.get('CallDuration')
+        recording_url = raw_data.get('RecordingUrl')
+        recording_sid = raw_data.get('RecordingSid')
+        transcription_text = raw_data.get('TranscriptionText')
+        transcription_sid = raw_data.get('TranscriptionSid')
+        transcription_status = raw_data.get('TranscriptionStatus')
+        
+        logger.info("📞 Received call transcription webhook - CallSid: %s, From: %s", call_sid, call_from)
         
         # Determine call direction based on Twilio phone number
         call_direction = 'inbound'
@@ -3287,6 +3592,9 @@ def webhook_receive_call_transcription():
                 patient_name = f"{patient.first_name} {patient.last_name}"
         
         if patient:
+            # One timestamp for the correspondence row and its webhook log
+            now = datetime.utcnow()
+            
             # Log the call to correspondence
             correspondence = PatientCorrespondence(
                 patient_id=patient.id,
@@ -3302,9 +3610,8 @@ def webhook_receive_call_transcription():
                 transcription_status=transcription_status or 'completed',
                 status=call_status or 'completed',
                 external_id=call_sid,
-                sent_at=datetime.utcnow()
+                sent_at=now
             )
-            db.session.add(correspondence)
             
             # Log successful webhook
             webhook_log = CommunicationWebhookLog(
@@ -3317,12 +3624,14 @@ def webhook_receive_call_transcription():
                 patient_id=patient.id,
                 patient_name=patient_name,
                 external_id=call_sid,
-                raw_request_data=json.dumps(raw_data)
+                raw_request_data=orjson.dumps(raw_data).decode(),
+                created_at=now
             )
-            db.session.add(webhook_log)
+            # Both rows go out in the same flush and transaction as one unit of work
+            db.session.add_all([correspondence, webhook_log])
             db.session.commit()
             
-            logger.info(f"✅ Logged call transcription for patient {patient.id}")
+            logger.info("✅ Logged call transcription for patient %s", patient.id)
             return jsonify({'success': True, 'message': 'Call transcription logged'}), 200
         else:
             # Patient not found - still log the webhook attempt
@@ -3335,7 +3644,7 @@ def webhook_receive_call_transcription():
                 patient_matched=False,
                 error_message=f"No patient found with phone number: {patient_phone}",
                 external_id=call_sid,
-                raw_request_data=json.dumps(raw_data)
+                raw_request_data=orjson.dumps(raw_data).decode()
             )
             db.session.add(webhook_log)
             db.session.commit()
@@ -3352,13 +3661,13 @@ def webhook_receive_call_transcription():
             webhook_log = CommunicationWebhookLog(
                 webhook_type='voice',
                 from_phone=call_from,
-                to_phone=request.form.get('To') if request.form else None,
-                message_body=request.form.get('TranscriptionText') if request.form else None,
+                to_phone=raw_data.get('To'),
+                message_body=raw_data.get('TranscriptionText'),
                 success=False,
                 patient_matched=False,
                 error_message=error_msg,
-                external_id=request.form.get('CallSid') if request.form else None,
-                raw_request_data=json.dumps(dict(request.form)) if request.form else None
+                external_id=raw_data.get('CallSid'),
+                raw_request_data=orjson.dumps(raw_data).decode() if raw_data else None
             )
             db.session.add(webhook_log)
             db.session.commit()
@@ -3393,13 +3702,14 @@ def webhook_receive_email():
         body = data.get('body') or data.get('html_body', '')
         message_id = data.get('message_id', '')
         
-        logger.info(f"📧 Received email from {from_email}: {subject}")
+        logger.info("📧 Received email from %s: %s", from_email, subject)
         
         # Try to find patient by email address
         patient = None
         if from_email:
+            # Case-insensitive equality on lower(email) is served by idx_patients_email_lower
             patient = Patient.query.filter(
-                Patient.email.ilike(from_email)
+                db.func.lower(Patient.email) == from_email.strip().lower()
             ).first()
         
         if patient:
@@ -3420,7 +3730,7 @@ def webhook_receive_email():
             db.session.add(correspondence)
             db.session.commit()
             
-            logger.info(f"✅ Logged inbound email from patient {patient.id}")
+            logger.info("✅ Logged inbound email from patient %s", patient.id)
             return jsonify({'success': True, 'message': 'Email logged', 'patient_id': patient.id}), 200
         else:
             # Patient not found - log it but don't create correspondence
@@ -3431,6 +3741,38 @@ def webhook_receive_email():
         logger.error(f"❌ Error processing inbound email: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Timestamp format the communications inbox displays (Australia/Sydney local time)
+CORRESPONDENCE_DATETIME_FORMAT = '%d/%m/%Y, %H:%M:%S'
+
+def encode_correspondence_cursor(correspondence):
+    """Opaque keyset cursor for the row a page ended on: base64 of [sent_at, id] (sent_at may be null)"""
+    sent_at = correspondence.sent_at.isoformat() if correspondence.sent_at else None
+    return base64.urlsafe_b64encode(orjson.dumps([sent_at, correspondence.id])).decode()
+
+def decode_correspondence_cursor(cursor):
+    """(sent_at, id) from encode_correspondence_cursor - raises ValueError on a malformed cursor"""
+    try:
+        sent_at, correspondence_id = orjson.loads(base64.urlsafe_b64decode(cursor))
+        return (datetime.fromisoformat(sent_at) if sent_at is not None else None), int(correspondence_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+# Inbox order: newest first, with undated rows (sent_at is nullable) ahead of all dated ones -
+# the same order as the (sent_at DESC, id DESC) index on Postgres, made explicit for SQLite
+CORRESPONDENCE_ORDER = (
+    PatientCorrespondence.sent_at.desc().nulls_first(),
+    PatientCorrespondence.id.desc()
+)
+
+def correspondence_after_cursor(cursor_sent_at, cursor_id):
+    """Filter for the rows that come after (cursor_sent_at, cursor_id) in CORRESPONDENCE_ORDER"""
+    sent_at, row_id = PatientCorrespondence.sent_at, PatientCorrespondence.id
+    if cursor_sent_at is None:
+        # Still in the undated rows: the rest of them by id, then every dated row
+        return or_(db.and_(sent_at.is_(None), row_id < cursor_id), sent_at.isnot(None))
+    # Undated rows all came before a dated cursor, and a NULL comparison excludes them here
+    return tuple_(sent_at, row_id) < tuple_(cursor_sent_at, cursor_id)
+
 @app.route('/api/correspondence/all', methods=['GET'])
 @optional_login_required
 def get_all_correspondence():
@@ -3444,92 +3786,131 @@ def get_all_correspondence():
         patient_filter = request.args.get('patient_filter', 'my_patients')  # 'my_patients' or 'all'
         limit = int(request.args.get('limit', 100))
         offset = int(request.args.get('offset', 0))
-        
-        # Build query
-        query = PatientCorrespondence.query.filter_by(is_deleted=False)
+        cursor = request.args.get('cursor')  # keyset cursor: next_cursor from the previous page
+        include_total = request.args.get('include_total') == '1'  # COUNT(*) only when the client shows it
+        
+        # Build query - only the listed columns, with patient names joined onto the same rows;
+        # plain result rows skip ORM instance hydration for the whole page
+        query = db.session.query(
+            PatientCorrespondence.id,
+            PatientCorrespondence.patient_id,
+            PatientCorrespondence.channel,
+            PatientCorrespondence.direction,
+            PatientCorrespondence.subject,
+            PatientCorrespondence.body,
+            PatientCorrespondence.recipient_email,
+            PatientCorrespondence.recipient_phone,
+            PatientCorrespondence.sender_email,
+            PatientCorrespondence.sender_phone,
+            PatientCorrespondence.status,
+            PatientCorrespondence.workflow_status,
+            PatientCorrespondence.external_id,
+            PatientCorrespondence.error_message,
+            PatientCorrespondence.sent_at,
+            PatientCorrespondence.delivered_at,
+            Patient.first_name,
+            Patient.last_name
+        ).outerjoin(
+            Patient, Patient.id == PatientCorrespondence.patient_id
+        ).filter(PatientCorrespondence.is_deleted == False)
         
         # Check if user is a practitioner and filter by their patients by default
         is_practitioner = current_user.is_authenticated and not current_user.is_admin and current_user.role in ['practitioner', 'nurse']
         
         # Apply practitioner patient filter
         if is_practitioner and patient_filter == 'my_patients':
-            # Get patient IDs who have appointments with this practitioner
-            patient_ids = db.session.query(Appointment.patient_id).filter(
+            # Restrict to patients who have appointments with this practitioner - the
+            # subquery runs in the database as a semi-join instead of a Python ID list
+            practitioner_patient_ids = db.session.query(Appointment.patient_id).filter(
                 Appointment.practitioner_id == current_user.id
-            ).distinct().all()
-            patient_ids = [pid[0] for pid in patient_ids]
-            
-            if patient_ids:
-                query = query.filter(PatientCorrespondence.patient_id.in_(patient_ids))
-            else:
-                # No patients, return empty result
-                return jsonify({
-                    'success': True,
-                    'correspondence': [],
-                    'total': 0,
-                    'limit': limit,
-                    'offset': offset
-                })
+            )
+            query = query.filter(PatientCorrespondence.patient_id.in_(practitioner_patient_ids))
         
         # Apply filters
         if channel:
-            query = query.filter_by(channel=channel)
+            query = query.filter(PatientCorrespondence.channel == channel)
         if direction:
-            query = query.filter_by(direction=direction)
+            query = query.filter(PatientCorrespondence.direction == direction)
         if workflow_status:
-            query = query.filter_by(workflow_status=workflow_status)
+            query = query.filter(PatientCorrespondence.workflow_status == workflow_status)
         
         # Patient search filter
         if patient_search:
-            query = query.join(Patient).filter(
-                (Patient.first_name.ilike(f'%{patient_search}%')) |
-                (Patient.last_name.ilike(f'%{patient_search}%')) |
-                (Patient.email.ilike(f'%{patient_search}%'))
+            # The pattern is sent as one bound parameter, so the compiled statement is reused
+            search_pattern = f'%{patient_search}%'
+            query = query.filter(
+                (Patient.first_name.ilike(search_pattern)) |
+                (Patient.last_name.ilike(search_pattern)) |
+                (Patient.email.ilike(search_pattern))
             )
         
-        # Get total count
-        total = query.count()
+        # Get total count - a second full aggregate, so only when asked for (first page load).
+        # Counting ids directly avoids Query.count() wrapping all the listed columns in a subquery
+        total = query.with_entities(db.func.count(PatientCorrespondence.id)).scalar() if include_total else None
         
-        # Get correspondence with pagination
-        correspondence = query.order_by(
-            PatientCorrespondence.sent_at.desc()
-        ).limit(limit).offset(offset).all()
+        # With a cursor, seek past the last row already shown instead of skipping offset rows,
+        # so deep pages stay as cheap as the first one
+        if cursor:
+            query = query.filter(correspondence_after_cursor(*decode_correspondence_cursor(cursor)))
+        else:
+            query = query.offset(offset)
         
-        # Format response
-        results = []
-        for c in correspondence:
-            patient = Patient.query.get(c.patient_id)
-            results.append({
-                'id': c.id,
-                'patient_id': c.patient_id,
-                'patient_name': f"{patient.first_name} {patient.last_name}" if patient else "Unknown",
-                'channel': c.channel,
-                'direction': c.direction,
-                'subject': c.subject,
-                'body': c.body,
-                'recipient_email': c.recipient_email,
-                'recipient_phone': c.recipient_phone,
-                'sender_email': c.sender_email,
-                'sender_phone': c.sender_phone,
-                'status': c.status,
-                'workflow_status': c.workflow_status,
-                'external_id': c.external_id,
-                'error_message': c.error_message,
-                'sent_at': format_local(c.sent_at, '%d/%m/%Y, %H:%M:%S') if c.sent_at else None,
-                'delivered_at': format_local(c.delivered_at, '%d/%m/%Y, %H:%M:%S') if c.delivered_at else None
-            })
+        query = query.order_by(*CORRESPONDENCE_ORDER).limit(limit + 1)
         
-        return jsonify({
+        # Get correspondence with pagination - one extra row tells us whether another page exists
+        rows = query.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        # Format response
+        results = [{
+            'id': r.id,
+            'patient_id': r.patient_id,
+            'patient_name': f"{r.first_name} {r.last_name}" if r.first_name is not None else "Unknown",
+            'channel': r.channel,
+            'direction': r.direction,
+            'subject': r.subject,
+            'body': r.body,
+            'recipient_email': r.recipient_email,
+            'recipient_phone': r.recipient_phone,
+            'sender_email': r.sender_email,
+            'sender_phone': r.sender_phone,
+            'status': r.status,
+            'workflow_status': r.workflow_status,
+            'external_id': r.external_id,
+            'error_message': r.error_message,
+            'sent_at': format_local(r.sent_at, CORRESPONDENCE_DATETIME_FORMAT),
+            'delivered_at': format_local(r.delivered_at, CORRESPONDENCE_DATETIME_FORMAT)
+        } for r in rows]
+        
+        body = app.json.dumps_bytes({
             'success': True,
             'correspondence': results,
             'total': total,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'has_more': has_more,
+            'next_cursor': encode_correspondence_cursor(rows[-1]) if has_more else None
         })
+        
+        # ETag over the exact page sent (and who it was sent to) - a client that already has it
+        # gets a 304 and skips the download and re-render
+        etag = hashlib.blake2b(body, digest_size=16, key=str(current_user.get_id()).encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        # Always revalidate (the page changes as messages arrive) and never share across users
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         logger.error(f"Error fetching all correspondence: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Workflow states a clinician can move a correspondence item into
+VALID_WORKFLOW_STATUSES = frozenset({'pending', 'completed', 'follow_up_needed', 'no_action_required'})
+
 @app.route('/api/correspondence/<int:correspondence_id>/workflow-status', methods=['PUT'])
 @optional_login_required
 def update_correspondence_workflow_status(correspondence_id):
@@ -3539,17 +3920,19 @@ def update_correspondence_workflow_status(correspondence_id):
         new_status = data.get('workflow_status')
         
         # Validate status
-        valid_statuses = ['pending', 'completed', 'follow_up_needed', 'no_action_required']
-        if new_status not in valid_statuses:
+        if new_status not in VALID_WORKFLOW_STATUSES:
             return jsonify({'success': False, 'error': 'Invalid workflow status'}), 400
         
-        # Get correspondence
-        correspondence = PatientCorrespondence.query.get(correspondence_id)
-        if not correspondence:
+        # Update in a single round-trip; RETURNING tells us whether the row exists
+        updated = db.session.execute(
+            db.update(PatientCorrespondence)
+            .where(PatientCorrespondence.id == correspondence_id)
+            .values(workflow_status=new_status)
+            .returning(PatientCorrespondence.id)
+        ).first()
+        if not updated:
+            db.session.rollback()
             return jsonify({'success': False, 'error': 'Correspondence not found'}), 404
-        
-        # Update status
-        correspondence.workflow_status = new_status
         db.session.commit()
         
         logger.info(f"✅ Updated correspondence {correspondence_id} workflow status to {new_status}")
@@ -3574,37 +3957,36 @@ def get_communication_webhook_logs():
         webhook_type = request.args.get('type')  # 'sms' or 'email'
         limit = int(request.args.get('limit', 50))
         
-        # Build query
-        query = CommunicationWebhookLog.query
+        # Column names match the response keys, so rows serialize directly with no per-row dict
+        # building; created_at goes out as-is (the orjson provider emits it in isoformat form)
+        query = db.select(
+            CommunicationWebhookLog.id,
+            CommunicationWebhookLog.webhook_type,
+            CommunicationWebhookLog.from_phone,
+            CommunicationWebhookLog.to_phone,
+            CommunicationWebhookLog.from_email,
+            CommunicationWebhookLog.to_email,
+            CommunicationWebhookLog.message_body,
+            CommunicationWebhookLog.message_subject,
+            CommunicationWebhookLog.success,
+            CommunicationWebhookLog.patient_matched,
+            CommunicationWebhookLog.patient_id,
+            CommunicationWebhookLog.patient_name,
+            CommunicationWebhookLog.error_message,
+            CommunicationWebhookLog.external_id,
+            CommunicationWebhookLog.raw_request_data,
+            CommunicationWebhookLog.created_at
+        )
         
         # Filter by type if specified
         if webhook_type:
-            query = query.filter_by(webhook_type=webhook_type)
+            query = query.where(CommunicationWebhookLog.webhook_type == webhook_type)
         
         # Get logs ordered by most recent first
-        logs = query.order_by(CommunicationWebhookLog.created_at.desc()).limit(limit).all()
-        
-        # Format response
-        results = []
-        for log in logs:
-            results.append({
-                'id': log.id,
-                'webhook_type': log.webhook_type,
-                'from_phone': log.from_phone,
-                'to_phone': log.to_phone,
-                'from_email': log.from_email,
-                'to_email': log.to_email,
-                'message_body': log.message_body,
-                'message_subject': log.message_subject,
-                'success': log.success,
-                'patient_matched': log.patient_matched,
-                'patient_id': log.patient_id,
-                'patient_name': log.patient_name,
-                'error_message': log.error_message,
-                'external_id': log.external_id,
-                'raw_request_data': log.raw_request_data,
-                'created_at': log.created_at.isoformat() if log.created_at else None
-            })
+        logs = db.session.execute(
+            query.order_by(CommunicationWebhookLog.created_at.desc()).limit(limit)
+        ).mappings().all()
+        results = [dict(log) for log in logs]
         
         return jsonify({
             'success': True,
@@ -3615,6 +3997,33 @@ def get_communication_webhook_logs():
         logger.error(f"Error fetching webhook logs: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Settings-page credential tests are usually clicked repeatedly with the same keys - reuse the
+# SDK clients and one HTTP session (and their TLS connection pools) instead of rebuilding per click
+CREDENTIAL_TEST_CLIENT_CACHE_SIZE = 8
+
+# Keep-alive pool for the credential-test HTTP session; idempotent GETs retry on transient
+# connection errors with a short backoff
+CREDENTIAL_TEST_POOL_CONNECTIONS = 10
+CREDENTIAL_TEST_POOL_MAXSIZE = 20
+CREDENTIAL_TEST_RETRIES = Retry(total=2, backoff_factor=0.2)
+
+credential_test_session = requests.Session()
+credential_test_session.mount('https://', HTTPAdapter(
+    pool_connections=CREDENTIAL_TEST_POOL_CONNECTIONS,
+    pool_maxsize=CREDENTIAL_TEST_POOL_MAXSIZE,
+    max_retries=CREDENTIAL_TEST_RETRIES
+))
+
+@lru_cache(maxsize=CREDENTIAL_TEST_CLIENT_CACHE_SIZE)
+def twilio_test_client(account_sid, auth_token):
+    """Twilio REST client for a credential test, shared across tests of the same credentials"""
+    return Client(account_sid, auth_token)
+
+@lru_cache(maxsize=CREDENTIAL_TEST_CLIENT_CACHE_SIZE)
+def openai_test_client(api_key, base_url=None):
+    """OpenAI-compatible client (OpenAI or xAI) for a credential test, shared per key"""
+    return openai.OpenAI(api_key=api_key, base_url=base_url)
+
 @app.route('/api/test-twilio-video', methods=['POST'])
 @optional_login_required
 def test_twilio_video_credentials():
@@ -3633,20 +4042,17 @@ def test_twilio_video_credentials():
             }), 400
         
         try:
-            from twilio.jwt.access_token import AccessToken
-            from twilio.jwt.access_token.grants import VideoGrant
-            
             # Try to generate a test token
             test_identity = 'test_user'
             use_api_keys = bool(api_key_sid and api_key_secret)
             
             if use_api_keys:
                 # Test with API Keys
-                token = AccessToken(account_sid, api_key_sid, api_key_secret, identity=test_identity)
+                token = video_access_token_factory(account_sid, api_key_sid, api_key_secret)(identity=test_identity)
                 method = 'API Keys'
             elif auth_token:
                 # Test with Account SID + Auth Token
-                token = AccessToken(account_sid, account_sid, auth_token, identity=test_identity)
+                token = video_access_token_factory(account_sid, account_sid, auth_token)(identity=test_identity)
                 method = 'Account SID + Auth Token (same as SMS)'
             else:
                 return jsonify({
@@ -3722,10 +4128,8 @@ def test_twilio_credentials():
             }), 400
         
         # Try to create Twilio client and fetch account info
-        from twilio.rest import Client
-        
         try:
-            client = Client(account_sid, auth_token)
+            client = twilio_test_client(account_sid, auth_token)
             
             # Fetch account info to verify credentials
             account = client.api.accounts(account_sid).fetch()
@@ -3796,8 +4200,7 @@ def test_openai_credentials():
         if not api_key.startswith('sk-'):
             return jsonify({'success': False, 'error': 'Invalid API key format. OpenAI keys start with "sk-"'}), 400
         
-        import openai
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_test_client(api_key)
         
         # Make a simple test request
         response = client.chat.completions.create(
@@ -3831,11 +4234,7 @@ def test_xai_credentials():
         if not api_key.startswith('xai-'):
             return jsonify({'success': False, 'error': 'Invalid API key format. xAI keys start with "xai-"'}), 400
         
-        import openai
-        client = openai.OpenAI(
-            api_key=api_key,
-            base_url="https://api.x.ai/v1"
-        )
+        client = openai_test_client(api_key, base_url="https://api.x.ai/v1")
         
         # Make a simple test request with Grok 3 (latest stable model)
         response = client.chat.completions.create(
@@ -3871,11 +4270,9 @@ def test_cliniko_credentials():
             return jsonify({'success': False, 'error': 'Shard is required'}), 400
         
         # Test the Cliniko API by fetching user info
-        from .patient_matcher import ClinikoIntegration
         cliniko_test = ClinikoIntegration(api_key, shard)
         
         # Try to get user info (this is a simple API call that will verify the credentials)
-        import requests
         url = f"https://api.{shard}.cliniko.com/v1/users"
         headers = {
             'Authorization': f'Basic {api_key}',
@@ -3883,7 +4280,7 @@ def test_cliniko_credentials():
             'User-Agent': 'CaptureCare (support@capturecare.com)'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = credential_test_session.get(url, headers=headers, timeout=10)
         
         if response.status_code == 200:
             data = response.json()
@@ -3916,11 +4313,9 @@ def test_heygen_credentials():
         if not api_key:
             return jsonify({'success': False, 'error': 'API key is required'}), 400
         
-        import requests
-        
         # Test by fetching avatars list
         headers = {'X-Api-Key': api_key}
-        response = requests.get('https://api.heygen.com/v2/avatars', headers=headers, timeout=30)
+        response = credential_test_session.get('https://api.heygen.com/v2/avatars', headers=headers, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -3956,9 +4351,6 @@ def test_smtp_credentials():
         # This handles Gmail app passwords and other passwords with special characters
         password = password_raw.replace('\xa0', ' ').replace('\u00a0', ' ').strip()
         
-        import smtplib
-        from email.mime.text import MIMEText
-        
         logger.info(f"🧪 Testing SMTP connection to {server}:{port} as {username}")
         
         # Try to connect and authenticate
@@ -3985,7 +4377,6 @@ def test_smtp_credentials():
         return jsonify({'success': False, 'error': 'Password encoding error. Please check your password for special characters and try again.'}), 400
     except Exception as e:
         logger.error(f"❌ Connection error: {e}")
-        import traceback
         logger.error(f"   Traceback: {traceback.format_exc()}")
         return jsonify({'success': False, 'error': f'Connection error: {str(e)}'}), 400
 
@@ -3994,8 +4385,6 @@ def test_smtp_credentials():
 def get_notification_templates():
     """Get notification templates for appointments"""
     try:
-        from .models import NotificationTemplate
-        
         templates = NotificationTemplate.query.filter_by(
             is_active=True,
             is_predefined=False
@@ -4029,16 +4418,16 @@ def api_generate_report(patient_id):
     # Get report type from query params
     report_type = request.args.get('report_type', 'patient')
     
-    # Get health data
-    health_data = HealthData.query.filter_by(patient_id=patient_id).order_by(HealthData.timestamp.desc()).limit(100).all()
-    health_summary = {}
-    for data in health_data:
-        if data.measurement_type not in health_summary:
-            health_summary[data.measurement_type] = []
-        health_summary[data.measurement_type].append({
-            'value': data.value,
-            'unit': data.unit,
-            'timestamp': data.timestamp
+    # Get health data - only the four columns the summary uses, as plain rows
+    health_data = HealthData.query.with_entities(
+        HealthData.measurement_type, HealthData.value, HealthData.unit, HealthData.timestamp
+    ).filter_by(patient_id=patient_id).order_by(HealthData.timestamp.desc()).limit(100).all()
+    health_summary = defaultdict(list)
+    for measurement_type, value, unit, timestamp in health_data:
+        health_summary[measurement_type].append({
+            'value': value,
+            'unit': unit,
+            'timestamp': timestamp
         })
     
     try:
@@ -4083,15 +4472,16 @@ def api_send_report(patient_id):
         if not report_html:
             return jsonify({'success': False, 'error': 'Report content is required'}), 400
         
-        # Handle file attachments
+        # Handle file attachments - only needed for the email, and passed as the upload streams
+        # so the sender reads each one as it attaches it (nothing is read when just saving a note)
         attachments = []
-        if 'attachments' in request.files:
+        if recipient_type and recipient_email and 'attachments' in request.files:
             files = request.files.getlist('attachments')
             for file in files:
                 if file and file.filename:
                     attachments.append({
                         'filename': file.filename,
-                        'content': file.read()
+                        'content': file.stream
                     })
         
         email_sent = False
@@ -4127,7 +4517,6 @@ def api_send_report(patient_id):
             logger.info(f"✅ Sent health report email to {recipient_email} for patient {patient_id}")
         
         # Save to patient correspondence (always save)
-        from .models import PatientCorrespondence
         correspondence = PatientCorrespondence(
             patient_id=patient_id,
             user_id=current_user.id if current_user.is_authenticated else None,
@@ -4172,45 +4561,94 @@ def api_send_report(patient_id):
         return jsonify({'success': False, 'error': str(e)}), 400
 
 # HeyGen Video Generation Endpoints
+@lru_cache(maxsize=1)
+def heygen_service_for(api_key):
+    """HeyGen client for an API key; a rotated key gets a new client on first use"""
+    return HeyGenService(api_key)
+
+def current_heygen_service():
+    """Shared HeyGenService for the configured API key, or None if HeyGen isn't configured"""
+    # Pick up rotated secrets (Secret Manager on Cloud Run), at most every few minutes
+    refresh_config()
+    api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
+    return heygen_service_for(api_key) if api_key else None
+
+# How long HeyGen avatar/voice/language lists are reused before asking HeyGen again (seconds);
+# they change on the order of days
+HEYGEN_CATALOG_CACHE_TIMEOUT = 3600
+
+# The voice list runs to 100 KB+ of JSON; gzip catalogue responses at least this big (bytes)
+HEYGEN_CATALOG_GZIP_MIN_SIZE = 1024
+HEYGEN_CATALOG_GZIP_LEVEL = 6
+
+def heygen_catalog(heygen_service, kind, fetch, *args):
+    """HeyGen reference list, fetched once per API key (and args) per HEYGEN_CATALOG_CACHE_TIMEOUT"""
+    key_id = hashlib.blake2b(heygen_service.api_key.encode(), digest_size=8).hexdigest()
+    cache_key = f"heygen:{kind}:{key_id}:{':'.join(map(str, args))}"
+    items = cache.get(cache_key)
+    if items is None:
+        items = fetch(*args)
+        # Don't cache empty lists - they usually mean HeyGen had a problem
+        if items:
+            cache.set(cache_key, items, timeout=HEYGEN_CATALOG_CACHE_TIMEOUT)
+    return items
+
+def heygen_catalog_response(payload):
+    """JSON response for a HeyGen list the browser may reuse, answering 304 when its copy is current"""
+    body = app.json.dumps_bytes(payload)
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    # Weak ETag: the gzip and identity encodings of a body are the same content
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    elif len(body) >= HEYGEN_CATALOG_GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+        # Same body -> same ETag, so the compressed bytes are cached alongside the lists
+        gzip_key = f'heygen:gzip:{etag}'
+        compressed = cache.get(gzip_key)
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=HEYGEN_CATALOG_GZIP_LEVEL)
+            cache.set(gzip_key, compressed, timeout=HEYGEN_CATALOG_CACHE_TIMEOUT)
+        response = app.response_class(compressed, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag, weak=True)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'private, max-age={HEYGEN_CATALOG_CACHE_TIMEOUT}'
+    return response
+
+def format_heygen_http_error(e):
+    """Error message for a failed HeyGen call, with the response body (parsed only if it's JSON)"""
+    response = getattr(e, 'response', None)
+    if response is None:
+        return f"HeyGen API HTTP error: {e}"
+    if 'json' in response.headers.get('content-type', ''):
+        try:
+            return f"HeyGen API HTTP error: {e} - {response.json()}"
+        except ValueError:
+            pass
+    return f"HeyGen API HTTP error: {e} - Response: {response.text[:200]}"
+
 @app.route('/api/heygen/avatars', methods=['GET'])
 @optional_login_required
 def get_heygen_avatars():
     """Get available HeyGen avatars"""
-    # Reload config to ensure secrets are loaded (for Cloud Run)
-    from .config import Config
-    
-    # Create a new Config instance to reload secrets from Secret Manager
-    config_instance = Config()
-    
     try:
-        # Get API key from config (which loads from Secret Manager in Cloud Run)
-        api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
-        if not api_key:
+        heygen_service = current_heygen_service()
+        if not heygen_service:
             logger.warning("⚠️  HeyGen API key not found in config or environment")
             logger.warning(f"Config.HEYGEN_API_KEY: {bool(Config.HEYGEN_API_KEY)}, os.getenv: {bool(os.getenv('HEYGEN_API_KEY'))}")
             logger.warning(f"USE_SECRET_MANAGER: {Config.USE_SECRET_MANAGER}, GCP_PROJECT_ID: {Config.GCP_PROJECT_ID}")
             return jsonify({'success': False, 'error': 'HeyGen API not configured'}), 400
         
-        logger.info(f"🔑 Using HeyGen API key: {api_key[:20]}..." if len(api_key) > 20 else f"🔑 Using HeyGen API key")
-        
-        # Create fresh HeyGen instance with current API key
-        heygen_service = HeyGenService(api_key)
-        avatars = heygen_service.get_avatars()
+        avatars = heygen_catalog(heygen_service, 'avatars', heygen_service.get_avatars)
         
         if not avatars:
             logger.warning("⚠️  No avatars returned from HeyGen API")
             return jsonify({'success': False, 'error': 'No avatars found. Please check your HeyGen API key.'}), 400
         
-        logger.info(f"✅ Retrieved {len(avatars)} avatars from HeyGen")
-        return jsonify({'success': True, 'avatars': avatars})
+        return heygen_catalog_response({'success': True, 'avatars': avatars})
     except requests.exceptions.HTTPError as e:
-        error_msg = f"HeyGen API HTTP error: {e}"
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_detail = e.response.json()
-                error_msg += f" - {error_detail}"
-            except:
-                error_msg += f" - Response: {e.response.text[:200]}"
+        error_msg = format_heygen_http_error(e)
         logger.error(error_msg)
         return jsonify({'success': False, 'error': error_msg}), 400
     except Exception as e:
@@ -4221,34 +4659,18 @@ def get_heygen_avatars():
 @optional_login_required
 def get_heygen_voices():
     """Get available HeyGen voices"""
-    # Reload config to ensure secrets are loaded (for Cloud Run)
-    from .config import Config
-    
-    # Create a new Config instance to reload secrets from Secret Manager
-    config_instance = Config()
-    
-    # Get API key from config (which loads from Secret Manager in Cloud Run)
-    api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
-    if not api_key:
+    heygen_service = current_heygen_service()
+    if not heygen_service:
         logger.warning("⚠️  HeyGen API key not found in config or environment")
         return jsonify({'success': False, 'error': 'HeyGen API not configured'}), 400
     
     try:
-        # Create fresh HeyGen instance with current API key
-        heygen_service = HeyGenService(api_key)
         language = request.args.get('language')
-        voices = heygen_service.get_voices(language)
-        
-        logger.info(f"✅ Retrieved {len(voices)} voices from HeyGen" + (f" (filtered for {language})" if language else ""))
-        return jsonify({'success': True, 'voices': voices})
+        all_voices = heygen_catalog(heygen_service, 'voices', heygen_service.get_all_voices)
+        voices = heygen_service.get_voices(language, voices=all_voices)
+        return heygen_catalog_response({'success': True, 'voices': voices})
     except requests.exceptions.HTTPError as e:
-        error_msg = f"HeyGen API HTTP error: {e}"
-        if hasattr(e, 'response') and e.response is not None:
-            try:
-                error_detail = e.response.json()
-                error_msg += f" - {error_detail}"
-            except:
-                error_msg += f" - Response: {e.response.text[:200]}"
+        error_msg = format_heygen_http_error(e)
         logger.error(error_msg)
         return jsonify({'success': False, 'error': error_msg}), 400
     except Exception as e:
@@ -4259,19 +4681,15 @@ def get_heygen_voices():
 @optional_login_required
 def get_heygen_languages():
     """Get available HeyGen voice languages"""
-    # Reload config to ensure secrets are loaded (for Cloud Run)
-    from .config import Config
-    config_instance = Config()
-    
-    api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
-    if not api_key:
+    heygen_service = current_heygen_service()
+    if not heygen_service:
         return jsonify({'success': False, 'error': 'HeyGen API not configured'}), 400
     
     try:
-        # Create fresh HeyGen instance with current API key
-        heygen_service = HeyGenService(api_key)
-        languages = heygen_service.get_languages()
-        return jsonify({'success': True, 'languages': languages})
+        # Derived from the (shared, cached) voice list - no separate HeyGen request
+        all_voices = heygen_catalog(heygen_service, 'voices', heygen_service.get_all_voices)
+        languages = heygen_service.get_languages(voices=all_voices)
+        return heygen_catalog_response({'success': True, 'languages': languages})
     except Exception as e:
         logger.error(f"Error fetching languages: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
@@ -4280,19 +4698,15 @@ def get_heygen_languages():
 @optional_login_required
 def generate_heygen_video():
     """Generate HeyGen video from health report script"""
-    # Reload config to ensure secrets are loaded (for Cloud Run)
-    from .config import Config
-    config_instance = Config()
-    
-    api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
-    if not api_key:
+    heygen_service = current_heygen_service()
+    if not heygen_service:
         return jsonify({'success': False, 'error': 'HeyGen API not configured'}), 400
     
     try:
-        # Create fresh HeyGen instance with current API key
-        heygen_service = HeyGenService(api_key)
         data = request.get_json()
         
+        # HeyGen renders asynchronously (the client polls /status), so the only slow part here is
+        # auto-selecting a voice/avatar - pick from the cached lists instead of re-fetching them
         result = heygen_service.generate_video(
             script=data.get('script'),
             avatar_id=data.get('avatar_id'),
@@ -4300,7 +4714,9 @@ def generate_heygen_video():
             voice_gender=data.get('voice_gender'),
             voice_language=data.get('voice_language', 'English'),
             voice_speed=float(data.get('voice_speed', 1.0)),
-            title=data.get('title', 'Health Report')
+            title=data.get('title', 'Health Report'),
+            voices=None if data.get('voice_id') else heygen_catalog(heygen_service, 'voices', heygen_service.get_all_voices),
+            avatars=None if data.get('avatar_id') else heygen_catalog(heygen_service, 'avatars', heygen_service.get_avatars)
         )
         
         if result:
@@ -4312,27 +4728,87 @@ def generate_heygen_video():
         logger.error(f"Error generating video: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# Clients poll video status every second or two; reuse a HeyGen answer for this long (seconds),
+# and keep finished/failed results much longer since they no longer change
+HEYGEN_STATUS_CACHE_TIMEOUT = 3
+HEYGEN_FINAL_STATUS_CACHE_TIMEOUT = 3600
+HEYGEN_FINAL_STATUSES = frozenset({'completed', 'failed'})
+
+# Simultaneous polls for one video wait for a single HeyGen request. A fixed set of locks,
+# picked by hashing the video id, so nothing has to be created or cleaned up per video
+HEYGEN_STATUS_LOCK_STRIPES = 64
+_heygen_status_locks = tuple(threading.Lock() for _ in range(HEYGEN_STATUS_LOCK_STRIPES))
+
+def heygen_video_status(heygen_service, video_id):
+    """HeyGen status for a video, cached briefly and fetched by only one thread at a time"""
+    cache_key = f'heygen_status:{video_id}'
+    result = cache.get(cache_key)
+    if result is not None:
+        return result
+    
+    with _heygen_status_locks[hash(video_id) % HEYGEN_STATUS_LOCK_STRIPES]:
+        # Another poll may have fetched it while we waited
+        result = cache.get(cache_key)
+        if result is None:
+            result = heygen_service.get_video_status(video_id)
+            timeout = HEYGEN_FINAL_STATUS_CACHE_TIMEOUT if result.get('status') in HEYGEN_FINAL_STATUSES else HEYGEN_STATUS_CACHE_TIMEOUT
+            cache.set(cache_key, result, timeout=timeout)
+    return result
+
 @app.route('/api/heygen/status/<video_id>', methods=['GET'])
 @optional_login_required
 def get_heygen_status(video_id):
     """Check HeyGen video generation status"""
-    # Reload config to ensure secrets are loaded (for Cloud Run)
-    from .config import Config
-    config_instance = Config()
-    
-    api_key = Config.HEYGEN_API_KEY or os.getenv('HEYGEN_API_KEY')
-    if not api_key:
+    heygen_service = current_heygen_service()
+    if not heygen_service:
         return jsonify({'success': False, 'error': 'HeyGen API not configured'}), 400
     
     try:
-        # Create fresh HeyGen instance with current API key
-        heygen_service = HeyGenService(api_key)
-        result = heygen_service.get_video_status(video_id)
+        result = heygen_video_status(heygen_service, video_id)
         return jsonify({'success': True, **result})
     except Exception as e:
         logger.error(f"Error checking video status: {e}")
         return jsonify({'success': False, 'error': str(e)}), 400
 
+# How long the admin dashboard's headline counts are reused (seconds); they're the same for
+# every admin and a minute of staleness is fine
+DASHBOARD_STATS_CACHE_TIMEOUT = 60
+DASHBOARD_STATS_CACHE_KEY = 'dashboard:stats:v1'
+
+def dashboard_stats():
+    """Patient/device/measurement counts for the admin dashboard, cached for DASHBOARD_STATS_CACHE_TIMEOUT"""
+    stats = cache.get(DASHBOARD_STATS_CACHE_KEY)
+    if stats is None:
+        # All four counts in one round-trip, as scalar subqueries of a single SELECT
+        counts = db.session.execute(db.select(
+            db.select(db.func.count()).select_from(Patient).scalar_subquery(),
+            db.select(db.func.count()).select_from(Patient)
+                .where(Patient.withings_user_id.isnot(None)).scalar_subquery(),
+            db.select(db.func.count()).select_from(HealthData)
+                .where(HealthData.timestamp >= datetime.now() - timedelta(days=1)).scalar_subquery(),
+            db.select(db.func.count()).select_from(Device).scalar_subquery()
+        )).one()
+        
+        stats = {
+            'total_patients': counts[0],
+            'connected_patients': counts[1],
+            'recent_measurements': counts[2],
+            'total_devices': counts[3]
+        }
+        cache.set(DASHBOARD_STATS_CACHE_KEY, stats, timeout=DASHBOARD_STATS_CACHE_TIMEOUT)
+    return stats
+
+def first_appointment_per_patient(order_by, *criteria):
+    """Map patient_id -> that patient's first appointment under order_by among those matching criteria"""
+    ranked = db.select(
+        Appointment.id,
+        db.func.row_number().over(partition_by=Appointment.patient_id, order_by=order_by).label('rn')
+    ).where(*criteria).subquery()
+    appointments = Appointment.query.filter(
+        Appointment.id.in_(db.select(ranked.c.id).where(ranked.c.rn == 1))
+    ).all()
+    return {appt.patient_id: appt for appt in appointments}
+
 @app.route('/dashboard')
 @optional_login_required
 def dashboard():
@@ -4343,47 +4819,39 @@ def dashboard():
         # Practitioner Dashboard
         now = datetime.now()
         
-        # Get upcoming appointments for this practitioner
+        # Get upcoming appointments for this practitioner - an index range scan on
+        # (practitioner_id, start_time) that stops after 10 rows. appointment.patient in the
+        # template resolves from the identity map once the patient list below is loaded.
         upcoming_appointments = Appointment.query.filter(
             Appointment.practitioner_id == current_user.id,
             Appointment.start_time >= now,
             Appointment.status != 'cancelled'
         ).order_by(Appointment.start_time.asc()).limit(10).all()
         
-        # Get all patients who have appointments with this practitioner
-        # Using a subquery to get unique patient IDs
-        patient_ids = db.session.query(Appointment.patient_id).filter(
-            Appointment.practitioner_id == current_user.id
-        ).distinct().all()
-        patient_ids = [pid[0] for pid in patient_ids]
-        
-        patients = Patient.query.filter(Patient.id.in_(patient_ids)).order_by(
-            Patient.first_name, Patient.last_name
-        ).all() if patient_ids else []
-        
-        # For each patient, get their last and next appointment with this practitioner
-        patients_with_appointments = []
-        for patient in patients:
-            # Last appointment (completed or in the past)
-            last_appt = Appointment.query.filter(
-                Appointment.patient_id == patient.id,
-                Appointment.practitioner_id == current_user.id,
-                Appointment.start_time < now
-            ).order_by(Appointment.start_time.desc()).first()
-            
-            # Next appointment (future)
-            next_appt = Appointment.query.filter(
-                Appointment.patient_id == patient.id,
-                Appointment.practitioner_id == current_user.id,
-                Appointment.start_time >= now,
-                Appointment.status != 'cancelled'
-            ).order_by(Appointment.start_time.asc()).first()
-            
-            patients_with_appointments.append({
-                'patient': patient,
-                'last_appointment': last_appt,
-                'next_appointment': next_appt
-            })
+        # Get all patients who have appointments with this practitioner (semi-join, one round-trip)
+        patients = Patient.query.filter(Patient.id.in_(
+            db.select(Appointment.patient_id).where(Appointment.practitioner_id == current_user.id)
+        )).order_by(Patient.first_name, Patient.last_name).all()
+        
+        # Each patient's last appointment (completed or in the past) and next (future) appointment
+        # with this practitioner - one query each rather than two per patient
+        last_appts = first_appointment_per_patient(
+            Appointment.start_time.desc(),
+            Appointment.practitioner_id == current_user.id,
+            Appointment.start_time < now
+        )
+        next_appts = first_appointment_per_patient(
+            Appointment.start_time.asc(),
+            Appointment.practitioner_id == current_user.id,
+            Appointment.start_time >= now,
+            Appointment.status != 'cancelled'
+        )
+        
+        patients_with_appointments = [{
+            'patient': patient,
+            'last_appointment': last_appts.get(patient.id),
+            'next_appointment': next_appts.get(patient.id)
+        } for patient in patients]
         
         return render_template('dashboard.html', 
                              is_practitioner=True,
@@ -4391,19 +4859,7 @@ def dashboard():
                              patients_with_appointments=patients_with_appointments)
     else:
         # Admin Dashboard (original)
-        total_patients = Patient.query.count()
-        connected_patients = Patient.query.filter(Patient.withings_user_id.isnot(None)).count()
-        
-        recent_data = HealthData.query.filter(
-            HealthData.timestamp >= datetime.now() - timedelta(days=1)
-        ).count()
-        
-        stats = {
-            'total_patients': total_patients,
-            'connected_patients': connected_patients,
-            'recent_measurements': recent_data,
-            'total_devices': Device.query.count()
-        }
+        stats = dashboard_stats()
         
         all_patients = Patient.query.order_by(Patient.first_name, Patient.last_name).all()
         
@@ -5100,10 +5556,78 @@ def create_database_indexes():
                 CREATE INDEX IF NOT EXISTS idx_appointments_patient_date 
                 ON appointments(patient_id, start_time DESC)
             """),
+            ("idx_appointments_practitioner_patient_start", """
+                CREATE INDEX IF NOT EXISTS idx_appointments_practitioner_patient_start 
+                ON appointments(practitioner_id, patient_id, start_time)
+            """),
+            ("idx_appointments_practitioner_start", """
+                CREATE INDEX IF NOT EXISTS idx_appointments_practitioner_start 
+                ON appointments(practitioner_id, start_time)
+            """),
             ("idx_devices_patient_id", """
                 CREATE INDEX IF NOT EXISTS idx_devices_patient_id 
                 ON devices(patient_id)
             """),
+            ("idx_patients_email_lower", """
+                CREATE INDEX IF NOT EXISTS idx_patients_email_lower 
+                ON patients(LOWER(email))
+            """),
+            ("pg_trgm", """
+                CREATE EXTENSION IF NOT EXISTS pg_trgm
+            """),
+            ("idx_patients_first_name_trgm", """
+                CREATE INDEX IF NOT EXISTS idx_patients_first_name_trgm 
+                ON patients USING gin (first_name gin_trgm_ops)
+            """),
+            ("idx_patients_last_name_trgm", """
+                CREATE INDEX IF NOT EXISTS idx_patients_last_name_trgm 
+                ON patients USING gin (last_name gin_trgm_ops)
+            """),
+            ("idx_patients_email_trgm", """
+                CREATE INDEX IF NOT EXISTS idx_patients_email_trgm 
+                ON patients USING gin (email gin_trgm_ops)
+            """),
+            ("idx_correspondence_patient_active_sent", """
+                CREATE INDEX IF NOT EXISTS idx_correspondence_patient_active_sent 
+                ON patient_correspondence(patient_id, sent_at DESC) 
+                WHERE is_deleted = FALSE
+            """),
+            ("idx_correspondence_active_sent_id", """
+                CREATE INDEX IF NOT EXISTS idx_correspondence_active_sent_id 
+                ON patient_correspondence(sent_at DESC, id DESC) 
+                WHERE is_deleted = FALSE
+            """),
+            ("idx_correspondence_active_filters_sent", """
+                CREATE INDEX IF NOT EXISTS idx_correspondence_active_filters_sent 
+                ON patient_correspondence(channel, direction, workflow_status, sent_at DESC) 
+                WHERE is_deleted = FALSE
+            """),
+            ("idx_comm_webhook_logs_created", """
+                CREATE INDEX IF NOT EXISTS idx_comm_webhook_logs_created 
+                ON communication_webhook_logs(created_at DESC)
+            """),
+            ("idx_comm_webhook_logs_type_created", """
+                CREATE INDEX IF NOT EXISTS idx_comm_webhook_logs_type_created 
+                ON communication_webhook_logs(webhook_type, created_at DESC)
+            """),
+            ("idx_patients_mobile_digits", """
+                CREATE INDEX IF NOT EXISTS idx_patients_mobile_digits 
+                ON patients(regexp_replace(mobile, '[^0-9]', '', 'g'))
+            """),
+            ("idx_patients_phone_digits", """
+                CREATE INDEX IF NOT EXISTS idx_patients_phone_digits 
+                ON patients(regexp_replace(phone, '[^0-9]', '', 'g'))
+            """),
+            ("idx_correspondence_call_sid", """
+                CREATE INDEX IF NOT EXISTS idx_correspondence_call_sid 
+                ON patient_correspondence(call_sid) 
+                WHERE call_sid IS NOT NULL
+            """),
+            ("idx_correspondence_external_id", """
+                CREATE INDEX IF NOT EXISTS idx_correspondence_external_id 
+                ON patient_correspondence(external_id) 
+                WHERE external_id IS NOT NULL
+            """),
         ]
         
         # Try to create patient_auth indexes if table exists
@@ -5261,7 +5785,6 @@ def google_callback():
     from google_auth_oauthlib.flow import Flow
     from google.oauth2 import id_token
     from google.auth.transport import requests as google_requests
-    import json
     
     # Allow OAuth to accept additional scopes without raising warnings
     os.environ['OAUTHLIB_RELAX_TOKEN_SCOPE'] = '1'
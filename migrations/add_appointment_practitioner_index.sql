@@ -0,0 +1,6 @@
+-- Migration: Index appointments by practitioner
+-- Purpose: The practitioner dashboard finds a practitioner's patients and each patient's last/next
+--          appointment; all three read (practitioner_id, patient_id, start_time) from this index
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_practitioner_patient_start ON appointments (practitioner_id, patient_id, start_time);
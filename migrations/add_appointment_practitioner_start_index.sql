@@ -0,0 +1,6 @@
+-- Migration: Index a practitioner's appointments by start time
+-- Purpose: The practitioner dashboard lists the next 10 upcoming appointments ordered by start_time;
+--          with this index that is a range scan that stops after 10 rows instead of a sort
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_appointments_practitioner_start ON appointments (practitioner_id, start_time);
@@ -0,0 +1,7 @@
+-- Migration: Indexes for the communication webhook log viewer
+-- Purpose: /api/communication-webhook-logs returns the most recent entries, optionally filtered by webhook_type;
+--          both shapes become an index range scan instead of sorting the whole log table
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_comm_webhook_logs_created ON communication_webhook_logs (created_at DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_comm_webhook_logs_type_created ON communication_webhook_logs (webhook_type, created_at DESC);
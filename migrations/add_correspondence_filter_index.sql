@@ -0,0 +1,6 @@
+-- Migration: Partial composite index for the all-correspondence inbox
+-- Purpose: /api/correspondence/all filters non-deleted rows by channel, direction and workflow status,
+--          newest first; this serves the filters and the sent_at ordering without a heap scan
+-- Note: CONCURRENTLY cannot run inside a transaction block
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_correspondence_active_filters_sent ON patient_correspondence (channel, direction, workflow_status, sent_at DESC) WHERE is_deleted = false;
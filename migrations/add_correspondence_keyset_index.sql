@@ -0,0 +1,6 @@
+-- Migration: Partial index for keyset pagination of the all-correspondence inbox
+-- Purpose: /api/correspondence/all pages with WHERE (sent_at, id) < (:sent_at, :id) ORDER BY sent_at DESC, id DESC;
+--          each page is an index range scan regardless of how deep the client has scrolled
+-- Note: CONCURRENTLY cannot run inside a transaction block
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_correspondence_active_sent_id ON patient_correspondence (sent_at DESC, id DESC) WHERE is_deleted = false;
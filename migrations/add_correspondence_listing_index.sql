@@ -0,0 +1,10 @@
+-- Migration: Partial composite index for per-patient correspondence listing
+-- Purpose: GET /api/patients/<id>/correspondence filters patient_id + is_deleted = false and sorts by sent_at DESC;
+--          this index returns those rows already ordered (no sort node)
+-- Note: CONCURRENTLY cannot run inside a transaction block - run this statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_correspondence_patient_active_sent
+    ON patient_correspondence (patient_id, sent_at DESC)
+    WHERE is_deleted = FALSE;
+
+-- Verify: EXPLAIN SELECT id FROM patient_correspondence WHERE patient_id = 1 AND is_deleted = FALSE ORDER BY sent_at DESC;
@@ -0,0 +1,7 @@
+-- Migration: Partial indexes on patient_correspondence Twilio SIDs
+-- Purpose: Call status/recording webhooks look up rows by call_sid, and SMS/call lookups use external_id;
+--          most rows have neither, so only non-NULL values are indexed
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_correspondence_call_sid ON patient_correspondence (call_sid) WHERE call_sid IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_correspondence_external_id ON patient_correspondence (external_id) WHERE external_id IS NOT NULL;
@@ -0,0 +1,7 @@
+-- Migration: Case-insensitive lookup index on patients.email
+-- Purpose: Make webhook / Cliniko import duplicate checks (LOWER(email) = ...) an index lookup
+-- Note: CONCURRENTLY cannot run inside a transaction block - run this statement on its own
+-- Note: Non-unique on purpose - only exact-case uniqueness (the email column constraint) is enforced,
+--       so existing case-variant duplicates don't stop the index from building
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_email_lower ON patients (LOWER(email));
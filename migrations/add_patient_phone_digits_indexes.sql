@@ -0,0 +1,7 @@
+-- Migration: Digits-only phone expression indexes on patients
+-- Purpose: Inbound SMS webhook matches the sender against regexp_replace(mobile/phone, '[^0-9]', '', 'g')
+--          with an index lookup instead of loading every patient
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_mobile_digits ON patients (regexp_replace(mobile, '[^0-9]', '', 'g'));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_phone_digits ON patients (regexp_replace(phone, '[^0-9]', '', 'g'));
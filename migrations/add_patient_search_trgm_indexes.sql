@@ -0,0 +1,10 @@
+-- Migration: Trigram indexes for patient name/email substring search
+-- Purpose: Patient search and the correspondence inbox filter with ILIKE '%term%' on first_name,
+--          last_name and email; a leading wildcard can't use a btree, but pg_trgm GIN indexes serve it
+-- Note: CONCURRENTLY cannot run inside a transaction block - run each statement on its own
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_first_name_trgm ON patients USING gin (first_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_last_name_trgm ON patients USING gin (last_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_patients_email_trgm ON patients USING gin (email gin_trgm_ops);
@@ -116,10 +116,78 @@ def create_indexes(engine):
             CREATE INDEX IF NOT EXISTS idx_appointments_patient_date 
             ON appointments(patient_id, start_time DESC)
         """),
+        ("idx_appointments_practitioner_patient_start", """
+            CREATE INDEX IF NOT EXISTS idx_appointments_practitioner_patient_start 
+            ON appointments(practitioner_id, patient_id, start_time)
+        """),
+        ("idx_appointments_practitioner_start", """
+            CREATE INDEX IF NOT EXISTS idx_appointments_practitioner_start 
+            ON appointments(practitioner_id, start_time)
+        """),
         ("idx_devices_patient_id", """
             CREATE INDEX IF NOT EXISTS idx_devices_patient_id 
             ON devices(patient_id)
         """),
+        ("idx_patients_email_lower", """
+            CREATE INDEX IF NOT EXISTS idx_patients_email_lower 
+            ON patients(LOWER(email))
+        """),
+        ("pg_trgm", """
+            CREATE EXTENSION IF NOT EXISTS pg_trgm
+        """),
+        ("idx_patients_first_name_trgm", """
+            CREATE INDEX IF NOT EXISTS idx_patients_first_name_trgm 
+            ON patients USING gin (first_name gin_trgm_ops)
+        """),
+        ("idx_patients_last_name_trgm", """
+            CREATE INDEX IF NOT EXISTS idx_patients_last_name_trgm 
+            ON patients USING gin (last_name gin_trgm_ops)
+        """),
+        ("idx_patients_email_trgm", """
+            CREATE INDEX IF NOT EXISTS idx_patients_email_trgm 
+            ON patients USING gin (email gin_trgm_ops)
+        """),
+        ("idx_correspondence_patient_active_sent", """
+            CREATE INDEX IF NOT EXISTS idx_correspondence_patient_active_sent 
+            ON patient_correspondence(patient_id, sent_at DESC) 
+            WHERE is_deleted = FALSE
+        """),
+        ("idx_correspondence_active_sent_id", """
+            CREATE INDEX IF NOT EXISTS idx_correspondence_active_sent_id 
+            ON patient_correspondence(sent_at DESC, id DESC) 
+            WHERE is_deleted = FALSE
+        """),
+        ("idx_correspondence_active_filters_sent", """
+            CREATE INDEX IF NOT EXISTS idx_correspondence_active_filters_sent 
+            ON patient_correspondence(channel, direction, workflow_status, sent_at DESC) 
+            WHERE is_deleted = FALSE
+        """),
+        ("idx_comm_webhook_logs_created", """
+            CREATE INDEX IF NOT EXISTS idx_comm_webhook_logs_created 
+            ON communication_webhook_logs(created_at DESC)
+        """),
+        ("idx_comm_webhook_logs_type_created", """
+            CREATE INDEX IF NOT EXISTS idx_comm_webhook_logs_type_created 
+            ON communication_webhook_logs(webhook_type, created_at DESC)
+        """),
+        ("idx_patients_mobile_digits", """
+            CREATE INDEX IF NOT EXISTS idx_patients_mobile_digits 
+            ON patients(regexp_replace(mobile, '[^0-9]', '', 'g'))
+        """),
+        ("idx_patients_phone_digits", """
+            CREATE INDEX IF NOT EXISTS idx_patients_phone_digits 
+            ON patients(regexp_replace(phone, '[^0-9]', '', 'g'))
+        """),
+        ("idx_correspondence_call_sid", """
+            CREATE INDEX IF NOT EXISTS idx_correspondence_call_sid 
+            ON patient_correspondence(call_sid) 
+            WHERE call_sid IS NOT NULL
+        """),
+        ("idx_correspondence_external_id", """
+            CREATE INDEX IF NOT EXISTS idx_correspondence_external_id 
+            ON patient_correspondence(external_id) 
+            WHERE external_id IS NOT NULL
+        """),
     ]
     
     # Try to create patient_auth indexes if table exists
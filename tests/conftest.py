@@ -0,0 +1,60 @@
+"""
+Shared pytest fixtures for CaptureCare
+Runs the Flask app against a throwaway SQLite database
+"""
+import os
+import tempfile
+
+import pytest
+
+# capturecare.config reads these at import time, so set them before anything imports the app
+_db_dir = tempfile.mkdtemp(prefix='capturecare-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ['USE_SECRET_MANAGER'] = 'False'
+
+
+@pytest.fixture(scope='session')
+def app():
+    # Importing web_dashboard builds the app and creates the tables
+    from capturecare.web_dashboard import app
+    app.config.update(TESTING=True)
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    """App context with a session; rows the tests create are deleted afterwards"""
+    from capturecare.models import db, Patient, PatientCorrespondence, WebhookLog
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for model in (PatientCorrespondence, WebhookLog, Patient):
+            db.session.query(model).delete()
+        db.session.commit()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def logged_in_client(app, client, db_session):
+    """Test client with a staff user logged in through the Flask-Login session"""
+    from capturecare.models import User
+    user = User.query.filter_by(username='pytest-admin').first()
+    if user is None:
+        user = User(
+            username='pytest-admin',
+            email='pytest-admin@example.com',
+            password_hash='not-a-real-hash',
+            role='admin',
+            is_admin=True
+        )
+        db_session.add(user)
+        db_session.commit()
+
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
+    return client
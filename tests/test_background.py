@@ -0,0 +1,48 @@
+"""
+Tests for the background batch writer
+"""
+from datetime import datetime
+
+from capturecare.background import BatchedInsertWriter
+from capturecare.models import WebhookLog
+
+
+def make_writer(app):
+    # A long flush interval, so only close() can get the rows written within the test
+    writer = BatchedInsertWriter(WebhookLog.__table__, batch_size=50, flush_interval=60)
+    writer.init_app(app)
+    return writer
+
+
+def test_close_flushes_queued_rows(app, db_session):
+    writer = make_writer(app)
+    writer.put(dict(success=True, email='a@example.com', created_at=datetime(2026, 1, 1)))
+    writer.put(dict(success=False, email='b@example.com', created_at=datetime(2026, 1, 2)))
+
+    writer.close()
+
+    assert not writer._thread.is_alive()
+    emails = {log.email for log in db_session.query(WebhookLog)}
+    assert emails == {'a@example.com', 'b@example.com'}
+
+
+def test_rows_with_different_keys_keep_column_defaults(app, db_session):
+    writer = make_writer(app)
+    writer.put(dict(success=True, email='a@example.com', created_at=datetime(2026, 1, 1)))
+    # No created_at: the column default must fill it rather than an explicit NULL
+    writer.put(dict(success=False, error_message='Missing required fields: email'))
+
+    writer.close()
+
+    logs = {log.success: log for log in db_session.query(WebhookLog)}
+    assert logs[True].created_at == datetime(2026, 1, 1)
+    assert logs[False].created_at is not None
+    assert logs[False].email is None
+
+
+def test_close_without_rows_is_a_no_op(app):
+    writer = make_writer(app)
+
+    writer.close()
+
+    assert writer._thread is None
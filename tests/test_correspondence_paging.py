@@ -0,0 +1,91 @@
+"""
+Tests for the all-correspondence inbox: keyset cursor paging and the page ETag
+"""
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+
+from capturecare.models import Patient, PatientCorrespondence
+from capturecare.web_dashboard import decode_correspondence_cursor, encode_correspondence_cursor
+
+CursorRow = namedtuple('CursorRow', 'sent_at id')
+
+
+@pytest.fixture
+def patient(db_session):
+    patient = Patient(first_name='Jane', last_name='Citizen', email='jane@example.com')
+    db_session.add(patient)
+    db_session.commit()
+    return patient
+
+
+def add_message(db_session, patient, sent_at, body='Hello'):
+    message = PatientCorrespondence(
+        patient_id=patient.id,
+        channel='sms',
+        direction='outbound',
+        body=body,
+        sent_at=sent_at
+    )
+    db_session.add(message)
+    db_session.commit()
+    return message.id
+
+
+def fetch_all_pages(client, limit):
+    ids, cursor = [], None
+    while True:
+        params = {'limit': limit, 'patient_filter': 'all'}
+        if cursor:
+            params['cursor'] = cursor
+        data = client.get('/api/correspondence/all', query_string=params).get_json()
+        ids.extend(item['id'] for item in data['correspondence'])
+        if not data['has_more']:
+            return ids
+        cursor = data['next_cursor']
+
+
+@pytest.mark.parametrize('sent_at', [datetime(2026, 3, 1, 9, 30, 15), None])
+def test_cursor_round_trip(sent_at):
+    cursor = encode_correspondence_cursor(CursorRow(sent_at, 42))
+
+    assert decode_correspondence_cursor(cursor) == (sent_at, 42)
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_correspondence_cursor('not-a-cursor')
+
+
+def test_pages_cover_every_row_once_including_undated(logged_in_client, db_session, patient):
+    dated = [add_message(db_session, patient, datetime(2026, 3, day)) for day in (1, 2, 3)]
+    undated = [add_message(db_session, patient, None) for _ in range(2)]
+
+    ids = fetch_all_pages(logged_in_client, limit=2)
+
+    # Undated rows first (newest id first), then dated rows newest first
+    assert ids == undated[::-1] + dated[::-1]
+
+
+def test_unchanged_page_revalidates_with_304(logged_in_client, db_session, patient):
+    add_message(db_session, patient, datetime(2026, 3, 1))
+    first = logged_in_client.get('/api/correspondence/all')
+    etag = first.headers['ETag']
+
+    repeat = logged_in_client.get('/api/correspondence/all', headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert repeat.status_code == 304
+    assert 'private' in repeat.headers['Cache-Control']
+
+
+def test_changed_page_gets_a_new_etag(logged_in_client, db_session, patient):
+    add_message(db_session, patient, datetime(2026, 3, 1))
+    etag = logged_in_client.get('/api/correspondence/all').headers['ETag']
+
+    add_message(db_session, patient, datetime(2026, 3, 2), body='A new reply')
+    response = logged_in_client.get('/api/correspondence/all', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,73 @@
+"""
+Tests for sending the iOS app invite (retries and failure logging)
+"""
+import pytest
+
+from capturecare import web_dashboard
+from capturecare.models import Patient
+
+
+class FakeNotificationService:
+    twilio_configured = True
+    smtp_configured = True
+
+
+class FakeSmsSender:
+    """Stands in for send_ios_invite_sms: returns the planned outcomes and records log_failure per attempt"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.log_failure_flags = []
+
+    def __call__(self, notif_service, patient, temp_password, user_id=None, log_failure=True):
+        self.log_failure_flags.append(log_failure)
+        return self.outcomes.pop(0)
+
+
+@pytest.fixture
+def patient(db_session):
+    patient = Patient(first_name='Jane', last_name='Citizen', email='jane@example.com', mobile='0400000000')
+    db_session.add(patient)
+    db_session.commit()
+    return patient
+
+
+@pytest.fixture
+def fake_sms(monkeypatch):
+    def install(outcomes):
+        sender = FakeSmsSender(outcomes)
+        monkeypatch.setattr(web_dashboard, 'send_ios_invite_sms', sender)
+        return sender
+    monkeypatch.setattr(web_dashboard, 'get_notification_service', FakeNotificationService)
+    monkeypatch.setattr(web_dashboard, 'INVITE_RETRY_DELAY', 0)
+    return install
+
+
+def test_failed_send_is_retried(patient, fake_sms):
+    sender = fake_sms([False, True])
+
+    errors = web_dashboard.send_ios_invite_messages(patient.id, 'temp-pass', ['sms'])
+
+    assert errors == {'sms': None}
+    # Only the last attempt may record a failed send
+    assert sender.log_failure_flags == [False, True]
+
+
+def test_send_that_keeps_failing_is_reported(patient, fake_sms):
+    sender = fake_sms([False] * web_dashboard.INVITE_SEND_ATTEMPTS)
+
+    errors = web_dashboard.send_ios_invite_messages(patient.id, 'temp-pass', ['sms'])
+
+    assert errors == {'sms': 'SMS service failed'}
+    assert len(sender.log_failure_flags) == web_dashboard.INVITE_SEND_ATTEMPTS
+    assert sender.log_failure_flags[-1] is True
+    assert not any(sender.log_failure_flags[:-1])
+
+
+def test_channels_are_not_mutated(patient, fake_sms):
+    fake_sms([False, True])
+    channels = ['sms']
+
+    web_dashboard.send_ios_invite_messages(patient.id, 'temp-pass', channels)
+
+    assert channels == ['sms']
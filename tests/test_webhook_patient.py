@@ -0,0 +1,74 @@
+"""
+Tests for the public patient webhook (/api/webhook/patient)
+"""
+import pytest
+
+from capturecare import web_dashboard
+from capturecare.models import Patient
+
+
+@pytest.fixture
+def webhook_logs(monkeypatch):
+    """Capture webhook log rows instead of writing them from the background writer"""
+    rows = []
+    monkeypatch.setattr(web_dashboard.webhook_log_writer, 'put', rows.append)
+    return rows
+
+
+def post_patient(client, email, first_name='Jane'):
+    return client.post('/api/webhook/patient', json={
+        'first_name': first_name,
+        'last_name': 'Citizen',
+        'email': email
+    })
+
+
+def test_creates_patient(client, db_session, webhook_logs):
+    response = post_patient(client, 'Jane@Example.com')
+
+    assert response.status_code == 201
+    patient = db_session.get(Patient, response.get_json()['patient_id'])
+    assert patient.email == 'jane@example.com'
+    assert webhook_logs[-1]['success'] is True
+
+
+def test_duplicate_email_is_case_insensitive(client, db_session, webhook_logs):
+    first_id = post_patient(client, 'jane@example.com').get_json()['patient_id']
+
+    response = post_patient(client, 'JANE@example.com')
+
+    assert response.status_code == 409
+    assert response.get_json()['patient_id'] == first_id
+    assert db_session.query(Patient).count() == 1
+
+
+def test_insert_conflict_returns_existing_patient(client, db_session, webhook_logs, monkeypatch):
+    """A concurrent call inserted the email after our pre-check: ON CONFLICT DO NOTHING, then 409"""
+    first_id = post_patient(client, 'jane@example.com').get_json()['patient_id']
+
+    real_find = web_dashboard.find_patient_by_email
+    calls = []
+    def find_after_race(email):
+        calls.append(email)
+        # The pre-check misses the row, as if it were committed just after the lookup
+        return None if len(calls) == 1 else real_find(email)
+    monkeypatch.setattr(web_dashboard, 'find_patient_by_email', find_after_race)
+
+    response = post_patient(client, 'jane@example.com', first_name='Janet')
+
+    assert response.status_code == 409
+    assert response.get_json()['patient_id'] == first_id
+    assert len(calls) == 2
+    assert db_session.query(Patient).count() == 1
+
+
+def test_conflict_without_existing_patient_is_an_error(client, db_session, webhook_logs, monkeypatch):
+    """No row returned and no patient found is inconsistent - it must not be reported as a success"""
+    post_patient(client, 'jane@example.com')
+    monkeypatch.setattr(web_dashboard, 'find_patient_by_email', lambda email: None)
+
+    response = post_patient(client, 'jane@example.com', first_name='Janet')
+
+    assert response.status_code == 500
+    assert response.get_json()['success'] is False
+    assert webhook_logs[-1]['success'] is False